@@ -0,0 +1,6 @@
+'''
+Benchmarks for the bucketlist API.
+
+Each module can be run on its own, e.g. python -m benchmarks.login,
+and prints its results as JSON.
+'''
@@ -0,0 +1,54 @@
+import argparse
+import json
+import sys
+
+'''
+Compares two reports of benchmarks.run, e.g. from two commits.
+
+    $ python -m benchmarks.compare before.json after.json --threshold 0.2
+
+Exits with status 1 when the p95 latency of any endpoint got worse
+by more than the threshold. req/s is the throughput of each endpoint
+over the whole run of the mixed workload.
+'''
+
+
+def change(before, after):
+    return (after - before) / before if before else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares two benchmark reports")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="largest allowed relative p95 slowdown")
+    args = parser.parse_args()
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    if before["scale"] != after["scale"] or before["seed"] != after["seed"]:
+        print("warning: the reports were made with different scales or seeds")
+
+    regressed = []
+    print("%-12s %10s %10s %10s %10s %8s" % ("endpoint", "p50", "p95", "p99", "req/s", "p95 +/-"))
+    for endpoint in sorted(after["endpoints"]):
+        new = after["endpoints"][endpoint]
+        old = before["endpoints"].get(endpoint)
+        if old is None:
+            continue
+        slowdown = change(old["p95_ms"], new["p95_ms"])
+        if slowdown > args.threshold:
+            regressed.append(endpoint)
+        print("%-12s %10.3f %10.3f %10.3f %10.1f %+7.0f%%" % (
+            endpoint, new["p50_ms"], new["p95_ms"], new["p99_ms"], new["throughput"],
+            100 * slowdown))
+    print("%-12s %10.1f -> %.1f req/s" % ("total", before["throughput"], after["throughput"]))
+    if regressed:
+        print("p95 regressions: " + ", ".join(regressed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from bucketlist import create_app, db
+from benchmarks import datagen
+from benchmarks.run import Workload, WORKLOAD
+from config import Config
+
+'''
+Compares throughput and lock errors of threads sharing one SQLite file,
+with SQLite's defaults and the pool SQLAlchemy picks for it, and with the
+pragmas and pool of config.Config.
+
+    $ python -m benchmarks.concurrency --threads 8 --requests 200
+'''
+
+MODES = {
+    "default": {"SQLITE_PRAGMAS": (), "SQLITE_QUEUE_POOL": False},
+    "tuned": {"SQLITE_PRAGMAS": Config.SQLITE_PRAGMAS, "SQLITE_QUEUE_POOL": True,
+              "SQLALCHEMY_POOL_SIZE": Config.SQLALCHEMY_POOL_SIZE},
+}
+
+
+def hammer(app, scale, threads, requests, seed):
+    """Runs the workload (without logins) in several threads"""
+    operations = [operation for operation, weight in WORKLOAD if operation != "login"
+                  for _ in range(weight)]
+    errors = []
+
+    def work(worker):
+        workload = Workload(app, scale, seed + worker)
+        for _ in range(requests):
+            try:
+                status = getattr(workload, workload.rng.choice(operations))().status_code
+            except Exception as e:
+                status = repr(e)
+            if status == 500 or not isinstance(status, int):
+                errors.append(status)
+
+    workers = [threading.Thread(target=work, args=(n,)) for n in range(threads)]
+    start = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.time() - start, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite concurrency benchmark")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--bucketlists", type=int, default=20, help="bucketlists per user")
+    parser.add_argument("--items", type=int, default=20, help="items per bucketlist")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="requests per thread")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scale = {"users": args.users, "bucketlists_per_user": args.bucketlists,
+             "items_per_bucketlist": args.items}
+    print("%-8s %-18s %10s %10s %8s" % ("mode", "pool", "seconds", "req/s", "errors"))
+    for mode in ("default", "tuned"):
+        directory = tempfile.mkdtemp()
+        # a new app on a new file, and so a new engine, per mode
+        settings = dict(MODES[mode], SQLALCHEMY_DATABASE_URI="sqlite:///" + os.path.join(
+            directory, "bench.sqlite"))
+        # the cache would hide the database from most reads
+        settings["RESPONSE_CACHE"] = None
+        app = create_app(type("BenchmarkConfig", (Config,), settings))
+        try:
+            with app.app_context():
+                datagen.generate(args.users, args.bucketlists, args.items, args.seed)
+            pool = type(db.get_engine(app).pool).__name__
+            seconds, errors = hammer(app, scale, args.threads, args.requests, args.seed)
+        finally:
+            db.get_engine(app).dispose()
+            shutil.rmtree(directory)
+        print("%-8s %-18s %10.2f %10.1f %8d" % (mode, pool, seconds,
+                                                args.threads * args.requests / seconds,
+                                                len(errors)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import random
+from datetime import datetime, timedelta
+from bucketlist import db
+from bucketlist.hashing import get_hasher
+from bucketlist.models import User, Bucketlist, BucketlistItem
+
+'''
+Synthetic data for the benchmarks.
+
+Rows are written with Core executemany in large batches with explicit
+ids, so generating millions of rows takes seconds instead of the hours
+per-row ORM adds would. The same seed always produces the same data.
+'''
+
+WORDS = ("trip", "visit", "learn", "climb", "paris", "tokyo", "guitar", "dive",
+         "marathon", "cook", "read", "paint", "ski", "safari", "kenya", "sail")
+
+PASSWORD = "benchpass"
+
+
+def username(user_id):
+    return "Benchuser%d" % user_id
+
+
+def _name(rng, index):
+    return "%s %s %d" % (rng.choice(WORDS), rng.choice(WORDS), index)
+
+
+def _insert(table, rows):
+    if rows:
+        db.session.execute(table.insert(), rows)
+
+
+def generate(users, bucketlists, items, seed=0, batch=10000):
+    """
+    Creates 'users' users, each with 'bucketlists' bucketlists of 'items' items.
+
+    Every user's password is PASSWORD.
+    """
+    rng = random.Random(seed)
+    password_hash = get_hasher().hash(PASSWORD)
+    start = datetime(2016, 1, 1)
+    db.create_all()
+
+    _insert(User.__table__, [{"id": user_id, "username": username(user_id),
+                              "password_hash": password_hash}
+                             for user_id in range(1, users + 1)])
+    bucketlist_rows, item_rows = [], []
+    bucketlist_id = item_id = 0
+    for user_id in range(1, users + 1):
+        for _ in range(bucketlists):
+            bucketlist_id += 1
+            created = start + timedelta(minutes=bucketlist_id)
+            bucketlist_rows.append({"id": bucketlist_id, "name": _name(rng, bucketlist_id),
+                                    "created_by": user_id, "date_created": created,
+                                    "date_modified": created})
+            for _ in range(items):
+                item_id += 1
+                item_rows.append({"id": item_id, "name": _name(rng, item_id),
+                                  "bucket": bucketlist_id, "created_by": user_id,
+                                  "done": rng.random() < 0.3, "date_created": created,
+                                  "date_modified": created})
+            if len(item_rows) >= batch or len(bucketlist_rows) >= batch:
+                _insert(Bucketlist.__table__, bucketlist_rows)
+                _insert(BucketlistItem.__table__, item_rows)
+                bucketlist_rows, item_rows = [], []
+    _insert(Bucketlist.__table__, bucketlist_rows)
+    _insert(BucketlistItem.__table__, item_rows)
+    db.session.commit()
+    return {"users": users, "bucketlists": bucketlist_id, "items": item_id}
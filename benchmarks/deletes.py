@@ -0,0 +1,81 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from sqlalchemy import event
+from bucketlist import create_app, db
+from bucketlist.models import Bucketlist
+from benchmarks import datagen
+
+'''
+Times deleting bucketlists with many items.
+
+    $ python -m benchmarks.deletes --items 20000 --repeat 3
+
+"orm" deletes the way the ORM cascade used to: every item is loaded
+into the session and deleted by id before the bucketlist. "cascade"
+deletes only the bucketlist and leaves its items to the database's
+ON DELETE CASCADE, which is what the delete endpoint does now.
+'''
+
+
+def delete_orm(bucketlist):
+    for item in bucketlist.items:
+        db.session.delete(item)
+    db.session.delete(bucketlist)
+
+
+def delete_cascade(bucketlist):
+    db.session.delete(bucketlist)
+
+
+MODES = (("orm", delete_orm), ("cascade", delete_cascade))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bucketlist delete benchmark")
+    parser.add_argument("--items", type=int, default=20000, help="items per bucketlist")
+    parser.add_argument("--repeat", type=int, default=3, help="bucketlists deleted per mode")
+    args = parser.parse_args()
+
+    app = create_app()
+    print("%d items per bucketlist" % args.items)
+    print("%-8s %10s %12s" % ("mode", "ms/delete", "statements"))
+    for mode, delete in MODES:
+        directory = tempfile.mkdtemp()
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(directory,
+                                                                           "bench.sqlite")
+        context = app.app_context()
+        context.push()
+        try:
+            datagen.generate(1, args.repeat, args.items)
+            db.session.remove()
+            event.listen(db.engine, "before_cursor_execute", record)
+            timings = []
+            for bucket_id in range(1, args.repeat + 1):
+                start = time.time()
+                delete(Bucketlist.query.get(bucket_id))
+                db.session.commit()
+                timings.append(time.time() - start)
+                db.session.remove()
+            event.remove(db.engine, "before_cursor_execute", record)
+        finally:
+            db.session.remove()
+            db.get_engine(app).dispose()
+            context.pop()
+            shutil.rmtree(directory)
+        print("%-8s %10.1f %12.1f" % (mode, 1000 * min(timings),
+                                      float(len(statements)) / args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from bucketlist import create_app, db
+from bucketlist.hashing import get_hasher
+from config import Config
+
+'''
+Reports logins per second for different password hashing costs.
+
+    $ python -m benchmarks.login --iterations 1000 50000 --pool-sizes 0 2 4
+'''
+
+
+def login(client, username):
+    response = client.post("/auth/login",
+                           data=json.dumps({"username": username, "password": "benchpass"}),
+                           content_type="application/json")
+    assert response.status_code == 200, response.data
+
+
+def run(uri, iterations, pool_size, threads, logins):
+    """Times 'logins' logins spread over 'threads' request threads"""
+    app = create_app(type("BenchmarkConfig", (Config,), {
+        "SQLALCHEMY_DATABASE_URI": uri, "PASSWORD_HASH_ITERATIONS": iterations,
+        "PASSWORD_HASH_POOL_SIZE": pool_size}))
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    client = app.test_client()
+    client.post("/auth/register",
+                data=json.dumps({"username": "benchuser", "password": "benchpass"}),
+                content_type="application/json")
+
+    def worker(count):
+        thread_client = app.test_client()
+        for _ in range(count):
+            login(thread_client, "benchuser")
+
+    workers = [threading.Thread(target=worker, args=(logins // threads,))
+               for _ in range(threads)]
+    start = time.time()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.time() - start
+    with app.app_context():
+        get_hasher().close()
+    db.get_engine(app).dispose()
+    return {"iterations": iterations, "pool_size": pool_size, "threads": threads,
+            "logins": logins // threads * threads,
+            "logins_per_second": round(logins // threads * threads / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Password hashing login benchmark")
+    parser.add_argument("--iterations", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[0, 2])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--logins", type=int, default=200)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    uri = "sqlite:///" + os.path.join(directory, "bench.sqlite")
+    try:
+        results = [run(uri, iterations, pool_size, args.threads, args.logins)
+                   for iterations in args.iterations
+                   for pool_size in args.pool_sizes]
+    finally:
+        shutil.rmtree(directory)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from bucketlist import create_app
+from bucketlist.auth import generate_auth_token
+from benchmarks import datagen
+from config import Config
+
+'''
+Runs a scripted mixed workload against generated data and reports
+throughput and latency percentiles per endpoint as JSON.
+
+    $ python -m benchmarks.run --users 100 --bucketlists 50 --items 20 --output before.json
+    $ python -m benchmarks.compare before.json after.json
+
+The workload is driven by a seeded random generator, so two runs with
+the same arguments issue the same requests and can be compared. The
+throughput of an endpoint is the number of its requests per second of
+the whole run, so the throughputs of the endpoints add up to the total.
+'''
+
+# (operation, weight) pairs of the mixed workload
+WORKLOAD = (("login", 5), ("list", 35), ("search", 15), ("get", 15),
+            ("create_item", 10), ("update_item", 12), ("delete_item", 8))
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    index = max(int(round(fraction * len(values) + 0.5)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+class Workload(object):
+    """Issues requests for the operations of the workload"""
+    def __init__(self, app, scale, seed):
+        self.app = app
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.client = app.test_client()
+        self.tokens = {}
+        self.created = 0
+
+    def _user(self):
+        user_id = self.rng.randint(1, self.scale["users"])
+        if user_id not in self.tokens:
+            with self.app.app_context():
+                self.tokens[user_id] = generate_auth_token(user_id)
+        return user_id, {"Authorization": "Token " + self.tokens[user_id]}
+
+    def _bucketlist(self, user_id):
+        per_user = self.scale["bucketlists_per_user"]
+        return (user_id - 1) * per_user + self.rng.randint(1, per_user)
+
+    def _item(self, bucketlist_id):
+        per_bucketlist = self.scale["items_per_bucketlist"]
+        return (bucketlist_id - 1) * per_bucketlist + self.rng.randint(1, per_bucketlist)
+
+    def login(self):
+        user_id = self.rng.randint(1, self.scale["users"])
+        return self.client.post("/auth/login", content_type="application/json",
+                                data=json.dumps({"username": datagen.username(user_id),
+                                                 "password": datagen.PASSWORD}))
+
+    def list(self):
+        _, headers = self._user()
+        return self.client.get("/bucketlists/?limit=20", headers=headers)
+
+    def search(self):
+        _, headers = self._user()
+        return self.client.get("/bucketlists/?q=" + self.rng.choice(datagen.WORDS)[:4],
+                               headers=headers)
+
+    def get(self):
+        user_id, headers = self._user()
+        return self.client.get("/bucketlists/%d" % self._bucketlist(user_id), headers=headers)
+
+    def create_item(self):
+        user_id, headers = self._user()
+        self.created += 1
+        return self.client.post("/bucketlists/%d/items/" % self._bucketlist(user_id),
+                                content_type="application/json", headers=headers,
+                                data=json.dumps({"name": "load item %d" % self.created,
+                                                 "done": ""}))
+
+    def update_item(self):
+        user_id, headers = self._user()
+        bucketlist_id = self._bucketlist(user_id)
+        return self.client.put("/bucketlists/%d/items/%d" % (bucketlist_id, self._item(bucketlist_id)),
+                               content_type="application/json", headers=headers,
+                               data=json.dumps({"done": self.rng.choice(("yes", "no"))}))
+
+    def delete_item(self):
+        user_id, headers = self._user()
+        bucketlist_id = self._bucketlist(user_id)
+        return self.client.delete("/bucketlists/%d/items/%d" % (bucketlist_id, self._item(bucketlist_id)),
+                                  headers=headers)
+
+
+def run(app, scale, requests, seed):
+    """Runs the workload and returns the latencies and errors per operation"""
+    workload = Workload(app, scale, seed)
+    operations = [operation for operation, weight in WORKLOAD for _ in range(weight)]
+    latencies = dict((operation, []) for operation, _ in WORKLOAD)
+    errors = dict((operation, 0) for operation, _ in WORKLOAD)
+    for _ in range(requests):
+        operation = workload.rng.choice(operations)
+        start = time.time()
+        response = getattr(workload, operation)()
+        latencies[operation].append(time.time() - start)
+        # a 404 is expected when an item was already deleted
+        if response.status_code >= 500:
+            errors[operation] += 1
+    return latencies, errors
+
+
+def report(latencies, errors, seconds):
+    """Returns the counts, throughput and latencies of a run of 'seconds' per operation"""
+    endpoints = {}
+    for operation, values in latencies.items():
+        values = sorted(values)
+        if not values:
+            continue
+        endpoints[operation] = {
+            "count": len(values),
+            "errors": errors[operation],
+            "throughput": round(len(values) / seconds, 1),
+            "mean_ms": round(1000 * sum(values) / len(values), 3),
+            "p50_ms": round(1000 * percentile(values, 0.50), 3),
+            "p95_ms": round(1000 * percentile(values, 0.95), 3),
+            "p99_ms": round(1000 * percentile(values, 0.99), 3),
+        }
+    return endpoints
+
+
+def commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.STDOUT).decode("ascii").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed workload benchmark")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--bucketlists", type=int, default=50, help="bucketlists per user")
+    parser.add_argument("--items", type=int, default=20, help="items per bucketlist")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hash-iterations", type=int,
+                        help="overrides PASSWORD_HASH_ITERATIONS to keep logins cheap")
+    parser.add_argument("--database", help="reuse (or create) this SQLite file "
+                                           "instead of a temporary one")
+    parser.add_argument("--output", help="writes the report to this file")
+    args = parser.parse_args()
+
+    directory = None
+    path = args.database
+    if path is None:
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "bench.sqlite")
+    # the endpoints are measured without the response cache, which would
+    # outlive the run in its file, and without the instrumentation
+    settings = {"SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.abspath(path),
+                "RESPONSE_CACHE": None, "METRICS": False, "SLOW_QUERY_THRESHOLD": None}
+    if args.hash_iterations:
+        settings["PASSWORD_HASH_ITERATIONS"] = args.hash_iterations
+    app = create_app(type("BenchmarkConfig", (Config,), settings))
+
+    scale = {"users": args.users, "bucketlists_per_user": args.bucketlists,
+             "items_per_bucketlist": args.items}
+    try:
+        generated = None
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            start = time.time()
+            with app.app_context():
+                generated = datagen.generate(args.users, args.bucketlists, args.items, args.seed)
+            generated["seconds"] = round(time.time() - start, 2)
+        start = time.time()
+        latencies, errors = run(app, scale, args.requests, args.seed)
+        elapsed = time.time() - start
+    finally:
+        if directory:
+            shutil.rmtree(directory)
+
+    result = {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "scale": scale,
+        "seed": args.seed,
+        "requests": args.requests,
+        "generated": generated,
+        "seconds": round(elapsed, 2),
+        "throughput": round(args.requests / elapsed, 1),
+        "endpoints": report(latencies, errors, elapsed),
+    }
+    output = json.dumps(result, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
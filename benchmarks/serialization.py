@@ -0,0 +1,87 @@
+import argparse
+import os
+import timeit
+from datetime import datetime, timedelta
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from flask import jsonify as flask_jsonify
+from bucketlist import create_app
+from bucketlist.encoding import BACKENDS, jsonify, format_date
+from bucketlist.models import Bucketlist, BucketlistItem
+
+'''
+Times the encoding of one page of bucketlists with their items.
+
+    $ python -m benchmarks.serialization --bucketlists 100 --items 50
+
+"flask" is what every response used to go through: Flask's pretty
+printing encoder converting each datetime. The other rows encode the
+same page, with dates formatted at export, through each backend; the
+"dates" row is the cost of that formatting, paid once per export.
+'''
+
+
+def page(bucketlists, items):
+    """Builds the data of a list response without touching the database"""
+    start = datetime(2016, 1, 1)
+    data = []
+    for bucket_id in range(1, bucketlists + 1):
+        bucketlist = Bucketlist(id=bucket_id, name="bucketlist %d" % bucket_id, created_by=1,
+                                date_created=start, date_modified=start)
+        children = [BucketlistItem(id=bucket_id * items + n, name="item %d" % n, done=n % 3 == 0,
+                                   date_created=start + timedelta(minutes=n),
+                                   date_modified=start + timedelta(minutes=n))
+                    for n in range(items)]
+        data.append(bucketlist.export_data(children))
+    return data
+
+
+def raw_page(data):
+    """The same page with datetime objects, as it was before dates were preformatted"""
+    start = datetime(2016, 1, 1)
+    raw = []
+    for bucketlist in data:
+        bucketlist = dict(bucketlist, date_created=start, date_modified=start)
+        bucketlist["items"] = [dict(item, date_created=start, date_modified=start)
+                               for item in bucketlist["items"]]
+        raw.append(bucketlist)
+    return raw
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON encoding benchmark")
+    parser.add_argument("--bucketlists", type=int, default=100)
+    parser.add_argument("--items", type=int, default=50, help="items per bucketlist")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.test_request_context():
+        data = page(args.bucketlists, args.items)
+        raw = raw_page(data)
+        size = len(jsonify({"Bucketlists": data}).get_data())
+
+        def flask():
+            app.config["JSONIFY_PRETTYPRINT_REGULAR"] = True
+            flask_jsonify({"Bucketlists": raw}).get_data()
+
+        print("%d bucketlists x %d items, %d bytes compact" % (args.bucketlists, args.items, size))
+        print("%-10s %10s" % ("encoder", "ms/page"))
+        timings = [("flask", flask)]
+        for backend in sorted(BACKENDS):
+            def encode(backend=backend):
+                app.config["JSONIFY_PRETTYPRINT_REGULAR"] = False
+                app.config["JSON_BACKEND"] = backend
+                jsonify({"Bucketlists": data}).get_data()
+            timings.append((backend, encode))
+        dates = [datetime(2016, 1, 1) + timedelta(minutes=n)
+                 for n in range(2 * args.bucketlists * (args.items + 1))]
+        timings.append(("dates", lambda: [format_date(date) for date in dates]))
+        for name, function in timings:
+            seconds = min(timeit.repeat(function, number=1, repeat=args.repeat))
+            print("%-10s %10.2f" % (name, 1000 * seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+'''
+Times a cold start, from the first import to the first request served,
+each run in a fresh interpreter.
+
+    $ python -m benchmarks.startup --repeat 10
+
+"package" only imports the package, "app" creates the app and serves a
+request, "manage" does the same through manage.py, and "manage db" adds
+the migration commands, which every manage.py command used to load.
+'''
+
+FIRST_REQUEST = "assert app.test_client().get('/bucketlists/').status_code == 401"
+
+STEPS = (
+    ("package", "import bucketlist"),
+    ("app", "from bucketlist import create_app; app = create_app(); " + FIRST_REQUEST),
+    ("manage", "from manage import app; " + FIRST_REQUEST),
+    ("manage db", "from manage import app, add_migrate_command; add_migrate_command(); " +
+     FIRST_REQUEST),
+)
+
+TIMED = "import time; start = time.time(); %s; print(time.time() - start)"
+
+
+def cold_start(code):
+    """Returns the seconds a fresh interpreter takes to run 'code', and its wall time"""
+    start = time.time()
+    output = subprocess.check_output([sys.executable, "-c", TIMED % code])
+    return float(output.decode("ascii").split()[-1]), time.time() - start
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    timings = dict((name, []) for name, _ in STEPS)
+    # the steps take turns, so a slow spell of the machine hits them all
+    for _ in range(args.repeat):
+        for name, code in STEPS:
+            timings[name].append(cold_start(code))
+    print("%-10s %10s %10s" % ("step", "ms", "wall ms"))
+    for name, _ in STEPS:
+        print("%-10s %10.1f %10.1f" % (name, 1000 * median([t for t, _ in timings[name]]),
+                                       1000 * median([wall for _, wall in timings[name]])))
+
+
+if __name__ == "__main__":
+    main()
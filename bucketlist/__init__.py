@@ -1,7 +1,69 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+import sqlite3
+from flask import Flask, current_app, has_app_context
+from flask_sqlalchemy import SQLAlchemy as BaseSQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
 import config
 
-app = Flask(__name__)
-app.config.from_object(config.Config)
-db = SQLAlchemy(app)
+
+class SQLAlchemy(BaseSQLAlchemy):
+    """
+    Pools connections to SQLite files instead of opening one per checkout,
+    unless SQLITE_QUEUE_POOL is off
+    """
+    def apply_driver_hacks(self, app, info, options):
+        super(SQLAlchemy, self).apply_driver_hacks(app, info, options)
+        if info.drivername != "sqlite":
+            return
+        if not app.config.get("SQLITE_QUEUE_POOL", True):
+            # SQLAlchemy picks the pool, a NullPool for files
+            if info.database not in (None, "", ":memory:"):
+                options.pop("poolclass", None)
+            for option in ("pool_size", "pool_timeout", "max_overflow"):
+                options.pop(option, None)
+        elif options.get("poolclass") in (NullPool, StaticPool):
+            # a NullPool, or the StaticPool of an in-memory database, has no queue to size
+            for option in ("pool_size", "pool_timeout", "max_overflow"):
+                options.pop(option, None)
+        elif "poolclass" not in options:
+            options["poolclass"] = QueuePool
+            # pooled connections are handed to whichever thread checks them out
+            options.setdefault("connect_args", {})["check_same_thread"] = False
+
+
+db = SQLAlchemy()
+
+
+def create_app(config_object=None):
+    """
+    Creates an app with a config object, config.Config by default.
+
+    The views, the request hooks and everything they import are only
+    loaded here, so importing the package stays cheap.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_object or config.Config)
+    db.init_app(app)
+
+    from bucketlist import auth, compression, counters, metrics, slow_queries
+    from bucketlist.views import api
+    app.register_blueprint(api)
+    auth.init_app(app)
+    slow_queries.init_app(app)
+    counters.init_app(app)
+    metrics.init_app(app)
+    # after the metrics, so they count the compressed bytes
+    compression.init_app(app)
+    return app
+
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Applies the SQLITE_PRAGMAS of the current app to every new SQLite connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection) or not has_app_context():
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in current_app.config.get("SQLITE_PRAGMAS", ()):
+        cursor.execute("PRAGMA %s = %s" % (name, value))
+    cursor.close()
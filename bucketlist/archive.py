@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+from flask import request
+from sqlalchemy import and_, literal, select
+from sqlalchemy.exc import IntegrityError
+from bucketlist import db
+from bucketlist.cache import get_cache
+from bucketlist.models import BucketlistItem, ArchivedItem
+
+'''
+Archiving of old done items.
+
+Done items that haven't been modified for a while are moved into the
+archive table, which has no name index and isn't searched, so the items
+table and its indexes only hold the items people still work on. Reads
+leave the archived items out unless they are asked for them.
+
+Items are moved in chunks, each in its own short transaction, in id
+order, so archiving can run while the app serves requests. Every
+statement re-checks that an item is still done and old, in case it
+changed after it was picked.
+'''
+
+COLUMNS = ("id", "name", "date_created", "date_modified", "done", "bucket", "created_by")
+
+
+def include_archived():
+    """Tells whether the request asks for the archived items too"""
+    return request.args.get("include_archived", "").lower() in ("true", "yes")
+
+
+def _bump(user_ids):
+    # the responses cached before the move no longer match the tables
+    cache = get_cache()
+    if cache is not None:
+        for user_id in user_ids:
+            cache.bump(user_id)
+
+
+def archive_items(days, chunk_size=500):
+    """
+    Moves the done items last modified more than 'days' days ago into
+    the archive table, and returns how many were moved
+    """
+    items, archive = BucketlistItem.__table__, ArchivedItem.__table__
+    now = datetime.now()
+    old = and_(items.c.done == True, items.c.date_modified < now - timedelta(days=days))  # noqa: E712
+    last_id, moved, user_ids = 0, 0, set()
+    while True:
+        rows = db.session.execute(select([items.c.id, items.c.created_by]).where(
+            and_(items.c.id > last_id, old)).order_by(items.c.id).limit(chunk_size)).fetchall()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        chunk = and_(items.c.id.in_(ids), old)
+        db.session.execute(archive.insert().from_select(
+            COLUMNS + ("date_archived",),
+            select([items.c[column] for column in COLUMNS] + [literal(now)]).where(chunk)))
+        moved += db.session.execute(items.delete().where(chunk)).rowcount
+        db.session.commit()
+        last_id = ids[-1]
+        user_ids.update(row.created_by for row in rows)
+    _bump(user_ids)
+    return moved
+
+
+def restore_items(bucket_id, chunk_size=500):
+    """
+    Moves the archived items of a bucketlist back into the items table.
+
+    Returns (restored, conflicts); items named like an item created since
+    they were archived are left in the archive, as the conflicts.
+    """
+    items, archive = BucketlistItem.__table__, ArchivedItem.__table__
+    last_id, restored, conflicts, user_ids = 0, 0, 0, set()
+    while True:
+        rows = db.session.execute(select([archive.c[column] for column in COLUMNS]).where(
+            and_(archive.c.bucket == bucket_id, archive.c.id > last_id)).order_by(
+            archive.c.id).limit(chunk_size)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        existing, new = BucketlistItem.existing_names(bucket_id, [row.name for row in rows]), []
+        for row in rows:
+            if row.name in existing:
+                conflicts += 1
+            else:
+                existing.add(row.name)
+                new.append(row)
+        if not new:
+            continue
+        try:
+            db.session.execute(items.insert(), [dict(row.items()) for row in new])
+            db.session.execute(archive.delete().where(archive.c.id.in_([row.id for row in new])))
+            db.session.commit()
+        except IntegrityError:
+            # an item with one of the names was created since the check above
+            db.session.rollback()
+            conflicts += len(new)
+            continue
+        restored += len(new)
+        user_ids.update(row.created_by for row in new)
+    _bump(user_ids)
+    return restored, conflicts
@@ -1,13 +1,105 @@
-from flask import g
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import g, current_app
 from flask_httpauth import HTTPTokenAuth
 from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
-from bucketlist import app
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+from bucketlist import db
 from bucketlist.models import User
 
 
 auth_token = HTTPTokenAuth("Token")
 
 
+class TokenCache(object):
+    """
+    A process-local LRU cache of verified tokens.
+
+    Maps the digest of a token to the identity of its user so that warm
+    requests skip both the signature check and the user lookup. Entries
+    live until the token expires or for 'ttl' seconds, whichever is first.
+    """
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.secret_key = None
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, digest):
+        """Returns the (user_id, username) of a cached token or None"""
+        with self.lock:
+            entry = self.entries.pop(digest, None)
+            if entry is None or entry[2] <= time.time():
+                self.misses += 1
+                return None
+            # re-inserting moves the entry to the most recently used end
+            self.entries[digest] = entry
+            self.hits += 1
+            return entry[:2]
+
+    def set(self, digest, user_id, username, expires_at):
+        """Caches a verified token until 'expires_at' at the latest"""
+        if self.size <= 0:
+            return
+        with self.lock:
+            self.entries.pop(digest, None)
+            self.entries[digest] = (user_id, username,
+                                    min(expires_at, time.time() + self.ttl))
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def use_key(self, secret_key):
+        """Drops every entry when the secret key has been rotated"""
+        if secret_key != self.secret_key:
+            self.clear()
+            self.secret_key = secret_key
+
+    def invalidate_user(self, user_id):
+        """Drops the tokens of a user"""
+        with self.lock:
+            for digest in [digest for digest, entry in self.entries.items()
+                           if entry[0] == user_id]:
+                del self.entries[digest]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Returns the counters used to tune the size and ttl"""
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "size": len(self.entries)}
+
+
+token_cache = TokenCache(1024, 300)
+_serializers = {}
+
+
+def init_app(app):
+    """Sizes the token cache from the config of an app"""
+    token_cache.size = app.config.get("TOKEN_CACHE_SIZE", 1024)
+    token_cache.ttl = app.config.get("TOKEN_CACHE_TTL", 300)
+
+
+@event.listens_for(User, "after_delete")
+def invalidate_deleted_user(mapper, connection, target):
+    token_cache.invalidate_user(target.id)
+
+
+def get_serializer(expires_in=None):
+    """Returns the serializer for the current SECRET_KEY, built only once"""
+    key = (current_app.config["SECRET_KEY"], expires_in)
+    if key not in _serializers:
+        _serializers[key] = Serializer(current_app.config["SECRET_KEY"], expires_in=expires_in)
+    return _serializers[key]
+
+
 def verify_password(username, password):
     """
     Login verification
@@ -16,6 +108,10 @@ def verify_password(username, password):
     if not g.user:
         return False
     elif g.user.check_password(password):
+        # upgrades hashes made with an older method or cost
+        if g.user.needs_rehash():
+            g.user.set_password(password)
+            db.session.commit()
         return g.user
 
 
@@ -23,8 +119,7 @@ def generate_auth_token(user_id, expires_in=3600):
     """
     Generates a token using the user's ID
     """
-    signature = Serializer(app.config["SECRET_KEY"], expires_in=expires_in)
-    return signature.dumps({"id": g.user.id})
+    return get_serializer(expires_in).dumps({"id": user_id})
 
 
 @auth_token.verify_token
@@ -32,10 +127,21 @@ def verify_auth_token(token):
     """
     Decrypts the token to verify the user's ID
     """
-    signature = Serializer(app.config["SECRET_KEY"])
+    token_cache.use_key(current_app.config["SECRET_KEY"])
+    digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    identity = token_cache.get(digest)
+    if identity is not None:
+        # attach the cached user to the session without querying for it
+        user = User(id=identity[0], username=identity[1])
+        make_transient_to_detached(user)
+        g.user = db.session.merge(user, load=False)
+        return g.user
+
     try:
-        data = signature.loads(token)
+        data, header = get_serializer().loads(token, return_header=True)
     except:
         return None
     g.user = User.query.get(data["id"])
+    if g.user:
+        token_cache.set(digest, g.user.id, g.user.username, header["exp"])
     return g.user
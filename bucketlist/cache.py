@@ -0,0 +1,233 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, request, Response
+
+'''
+Response cache for the read endpoints.
+
+Entries are keyed by user, endpoint, arguments and a per-user version.
+Every successful write bumps the version of its user, so entries made
+before the write are never looked up again and simply age out. Entries
+also expire after RESPONSE_CACHE_TTL seconds, which bounds how stale a
+response can be when a version was bumped somewhere the cache can't see.
+'''
+
+
+class MemoryBackend(object):
+    """
+    An in-process LRU backend. Versions are private to each process, so
+    use the sqlite backend when the app runs in several worker processes.
+    """
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return None
+            created, value = entry
+            if time.time() - created >= self.ttl:
+                self.bytes -= len(value[2])
+                return None
+            # re-inserting moves the entry to the most recently used end
+            self.entries[key] = entry
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[1][2])
+            self.entries[key] = (time.time(), value)
+            self.bytes += len(value[2])
+            while len(self.entries) > self.size:
+                self.bytes -= len(self.entries.popitem(last=False)[1][1][2])
+
+    def version(self, user_id):
+        return self.versions.get(user_id, 0)
+
+    def bump(self, user_id):
+        with self.lock:
+            self.versions[user_id] = self.versions.get(user_id, 0) + 1
+
+    def stats(self):
+        return {"entries": len(self.entries), "bytes": self.bytes}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.versions.clear()
+            self.bytes = 0
+
+
+class SQLiteBackend(object):
+    """
+    A backend in a local SQLite file, shared by all the worker processes
+    on a machine. When full, the oldest entries are dropped first.
+    """
+    def __init__(self, path, size, ttl):
+        self.path = path
+        self.size = size
+        self.ttl = ttl
+        self.local = threading.local()
+        self.writes = 0
+
+    def _connection(self):
+        # connections are never shared across threads or forked processes
+        if getattr(self.local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS response ("
+                               "key TEXT PRIMARY KEY, value BLOB, created REAL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_response_created "
+                               "ON response (created)")
+            connection.execute("CREATE TABLE IF NOT EXISTS version ("
+                               "user_id INTEGER PRIMARY KEY, version INTEGER)")
+            self.local.connection, self.local.pid = connection, os.getpid()
+        return self.local.connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM response WHERE key = ? AND created > ?",
+            (key, time.time() - self.ttl)).fetchone()
+        return pickle.loads(bytes(row[0])) if row else None
+
+    def set(self, key, value):
+        connection = self._connection()
+        connection.execute("INSERT OR REPLACE INTO response VALUES (?, ?, ?)",
+                           (key, sqlite3.Binary(pickle.dumps(value, 2)), time.time()))
+        self.writes += 1
+        if self.writes % 100 == 0:
+            connection.execute("DELETE FROM response WHERE key IN (SELECT key FROM response "
+                               "ORDER BY created DESC LIMIT -1 OFFSET ?)", (self.size,))
+
+    def version(self, user_id):
+        row = self._connection().execute("SELECT version FROM version WHERE user_id = ?",
+                                         (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, user_id):
+        connection = self._connection()
+        connection.execute("INSERT OR IGNORE INTO version VALUES (?, 0)", (user_id,))
+        connection.execute("UPDATE version SET version = version + 1 WHERE user_id = ?",
+                           (user_id,))
+
+    def stats(self):
+        entries, size = self._connection().execute(
+            "SELECT count(*), coalesce(sum(length(value)), 0) FROM response").fetchone()
+        return {"entries": entries, "bytes": size}
+
+    def clear(self):
+        connection = self._connection()
+        connection.execute("DELETE FROM response")
+        connection.execute("DELETE FROM version")
+
+
+class ResponseCache(object):
+    """Caches whole responses per user in a backend and counts hits"""
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = self.misses = 0
+
+    def key(self, user_id):
+        """Returns the key of the current request for a user"""
+        raw = repr((user_id, self.backend.version(user_id), request.endpoint,
+                    sorted(request.view_args.items()),
+                    sorted(request.args.items(multi=True))))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key, response):
+        self.backend.set(key, (response.status_code, list(response.headers.items()),
+                               response.get_data()))
+
+    def get_encoded(self, key, encoding):
+        """Returns the body of an entry compressed with an encoding, if it's cached"""
+        entry = self.backend.get(key + "." + encoding)
+        return entry[2] if entry is not None else None
+
+    def set_encoded(self, key, encoding, body):
+        self.backend.set(key + "." + encoding, (200, [], body))
+
+    def bump(self, user_id):
+        self.backend.bump(user_id)
+
+    def stats(self):
+        """Returns the hit ratio and the size of the cache"""
+        stats = self.backend.stats()
+        lookups = self.hits + self.misses
+        stats.update(hits=self.hits, misses=self.misses,
+                     hit_ratio=float(self.hits) / lookups if lookups else 0.0)
+        return stats
+
+    def clear(self):
+        self.backend.clear()
+        self.hits = self.misses = 0
+
+
+_caches = {}
+
+
+def get_cache():
+    """Returns the response cache for the current config, or None when it's off"""
+    config = current_app.config
+    key = (config.get("RESPONSE_CACHE"), config.get("RESPONSE_CACHE_SIZE", 1000),
+           config.get("RESPONSE_CACHE_TTL", 300), config.get("RESPONSE_CACHE_PATH"))
+    if not key[0]:
+        return None
+    if key not in _caches:
+        if key[0] == "sqlite":
+            _caches[key] = ResponseCache(SQLiteBackend(key[3], key[1], key[2]))
+        else:
+            _caches[key] = ResponseCache(MemoryBackend(key[1], key[2]))
+    return _caches[key]
+
+
+def cached(view):
+    """Serves a read view from the cache of the logged-in user"""
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        cache = get_cache()
+        if cache is None:
+            return view(*args, **kwargs)
+        key = g.response_cache_key = cache.key(g.user.id)
+        entry = cache.get(key)
+        if entry is not None:
+            status, headers, body = entry
+            return Response(body, status, headers).make_conditional(request)
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            cache.set(key, response)
+        return response
+    return decorated
+
+
+def invalidates_cache(view):
+    """Bumps the cache version of the logged-in user after a successful write"""
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        response = current_app.make_response(view(*args, **kwargs))
+        cache = get_cache()
+        if cache is not None and response.status_code < 400:
+            cache.bump(g.user.id)
+        return response
+    return decorated
@@ -0,0 +1,92 @@
+import zlib
+from flask import current_app, g, request
+from bucketlist.cache import get_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+'''
+Negotiated compression of the responses.
+
+Responses of the types in MIMETYPES are compressed with the encoding
+the client prefers among brotli (when installed), gzip and deflate.
+Bodies smaller than COMPRESS_MIN_SIZE go out as they are. Streamed
+responses are compressed chunk by chunk, flushing after each chunk so
+they stay streamed. The compressed bodies of cached responses are
+cached next to them, so cache hits aren't compressed again.
+'''
+
+MIMETYPES = ("application/json", "application/x-ndjson", "text/plain", "text/html")
+
+# the window bits of each zlib based encoding
+WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def compress(data, encoding):
+    """Compresses a whole body with an encoding at the configured level"""
+    if encoding == "br":
+        return brotli.compress(data, quality=current_app.config.get("COMPRESS_BROTLI_QUALITY", 5))
+    compressor = zlib.compressobj(current_app.config.get("COMPRESS_LEVEL", 6), zlib.DEFLATED,
+                                  WBITS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding, level):
+    """Compresses the chunks of a streamed body as they are produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def negotiate(streamed=False):
+    """
+    Returns the encoding the client accepts with the highest quality,
+    preferring brotli, then gzip, then deflate on ties, or None
+    """
+    encodings = ["gzip", "deflate"]
+    if brotli is not None and not streamed:
+        encodings.insert(0, "br")
+    quality, _, encoding = max((request.accept_encodings[encoding], -index, encoding)
+                               for index, encoding in enumerate(encodings))
+    return encoding if quality > 0 else None
+
+
+def compress_response(response):
+    if (not current_app.config.get("COMPRESSION") or response.mimetype not in MIMETYPES or
+            response.status_code < 200 or response.status_code in (204, 304) or
+            "Content-Encoding" in response.headers):
+        return response
+    # the body depends on the Accept-Encoding of the request
+    response.vary.add("Accept-Encoding")
+    if response.is_streamed:
+        encoding = negotiate(streamed=True)
+        if encoding is None:
+            return response
+        response.response = compress_stream(response.iter_encoded(), encoding,
+                                            current_app.config.get("COMPRESS_LEVEL", 6))
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        encoding = negotiate()
+        if encoding is None or len(data) < current_app.config.get("COMPRESS_MIN_SIZE", 500):
+            return response
+        cache, key = get_cache(), g.get("response_cache_key")
+        body = None
+        if cache is not None and key is not None and response.status_code == 200:
+            body = cache.get_encoded(key, encoding)
+            if body is None:
+                body = compress(data, encoding)
+                cache.set_encoded(key, encoding, body)
+        response.set_data(body or compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(app):
+    """Compresses the responses of an app"""
+    app.after_request(compress_response)
@@ -0,0 +1,100 @@
+import hashlib
+from collections import namedtuple
+from flask import request, Response
+from sqlalchemy import func
+from bucketlist import db
+from bucketlist.encoding import jsonify
+from bucketlist.models import Bucketlist, BucketlistItem
+
+'''
+Conditional requests for the bucketlist endpoints.
+
+The validators come from a single aggregate query over date_modified
+and the row counts, which runs before any rows are loaded, so polling
+clients that already have the latest data get an empty 304.
+
+Only ETags are sent. A deletion doesn't move any date_modified, so
+Last-Modified and If-Modified-Since would hide it; the counts in the
+ETag don't. The ETag only depends on the state, so an ETag from any
+GET of a bucketlist works in the If-Match of its updates.
+'''
+
+State = namedtuple("State", ["last_modified", "counts"])
+
+
+def _latest(*dates):
+    dates = [date for date in dates if date is not None]
+    return max(dates) if dates else None
+
+
+def collection_state(user_id, items=True):
+    """
+    Returns the State of all of a user's bucketlists and items.
+
+    Without 'items', the state only covers the columns of the bucketlists,
+    including the item and done counts the triggers keep on them, so the
+    items aren't read.
+    """
+    if not items:
+        row = db.session.query(
+            func.max(Bucketlist.date_modified), func.count(Bucketlist.id),
+            func.sum(Bucketlist.item_count), func.sum(Bucketlist.done_count)).filter(
+            Bucketlist.created_by == user_id).one()
+        return State(row[0], (row[1], row[2], row[3]))
+    bucketlists = db.session.query(
+        func.max(Bucketlist.date_modified).label("last_modified"),
+        func.count(Bucketlist.id).label("count")).filter(
+        Bucketlist.created_by == user_id).subquery()
+    items = db.session.query(
+        func.max(BucketlistItem.date_modified).label("last_modified"),
+        func.count(BucketlistItem.id).label("count")).filter(
+        BucketlistItem.created_by == user_id).subquery()
+    row = db.session.query(bucketlists.c.last_modified, bucketlists.c.count,
+                           items.c.last_modified, items.c.count).one()
+    return State(_latest(row[0], row[2]), (row[1], row[3]))
+
+
+def bucketlist_state(bucket_id, user_id):
+    """Returns the State of a bucketlist and its items, or None if it isn't found"""
+    items = db.session.query(
+        func.max(BucketlistItem.date_modified).label("last_modified"),
+        func.count(BucketlistItem.id).label("count")).filter(
+        BucketlistItem.bucket == bucket_id).subquery()
+    row = db.session.query(Bucketlist.date_modified, items.c.last_modified,
+                           items.c.count).filter(
+        Bucketlist.id == bucket_id, Bucketlist.created_by == user_id).first()
+    if row is None:
+        return None
+    return State(_latest(row[0], row[1]), (row[2],))
+
+
+def make_etag(state):
+    """Returns a weak ETag for a state"""
+    seed = repr((state.last_modified, state.counts))
+    return hashlib.sha1(seed.encode("utf-8")).hexdigest()[:20]
+
+
+def not_modified(state):
+    """
+    Returns a 304 response when the client's copy is up to date,
+    otherwise None
+    """
+    if request.if_none_match.contains_weak(make_etag(state)):
+        return add_validators(Response(status=304), state)
+
+
+def precondition_failed(bucket_id, user_id):
+    """
+    Returns a 412 response when the request has an If-Match header that
+    doesn't match the current bucketlist, otherwise None
+    """
+    if request.if_match:
+        etag = make_etag(bucketlist_state(bucket_id, user_id))
+        if not request.if_match.contains_weak(etag):
+            return jsonify({"Message": "The bucketlist has been changed. Please get it and try again"}), 412
+
+
+def add_validators(response, state):
+    """Sets the ETag header of a response"""
+    response.set_etag(make_etag(state), weak=True)
+    return response
@@ -0,0 +1,61 @@
+from sqlalchemy import event
+from bucketlist import db
+from bucketlist.models import BucketlistItem, ArchivedItem
+
+'''
+Item counters of bucketlists.
+
+Bucketlist.item_count and done_count are kept up to date by triggers
+on the items table, so every write path (ORM, bulk inserts, imports or
+raw SQL) updates them in the same transaction. Archived items still
+count, so the archive table has the same triggers. The triggers are
+SQLite only, like the search index; recompute_counts fixes the counters
+up on any database.
+'''
+
+_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS %(name)s_ai AFTER INSERT ON %(table)s "
+    "BEGIN UPDATE bucketlist SET item_count = item_count + 1, "
+    "done_count = done_count + (new.done = 1) WHERE id = new.bucket; END",
+    "CREATE TRIGGER IF NOT EXISTS %(name)s_ad AFTER DELETE ON %(table)s "
+    "BEGIN UPDATE bucketlist SET item_count = item_count - 1, "
+    "done_count = done_count - (old.done = 1) WHERE id = old.bucket; END",
+    "CREATE TRIGGER IF NOT EXISTS %(name)s_au AFTER UPDATE OF done, bucket "
+    "ON %(table)s BEGIN "
+    "UPDATE bucketlist SET item_count = item_count - 1, "
+    "done_count = done_count - (old.done = 1) WHERE id = old.bucket; "
+    "UPDATE bucketlist SET item_count = item_count + 1, "
+    "done_count = done_count + (new.done = 1) WHERE id = new.bucket; END",
+]
+
+TRIGGERS = dict((table, [trigger % {"table": table, "name": name} for trigger in _TRIGGERS])
+                for table, name in (("bucketlist_item", "bucketlist_item_counts"),
+                                    ("archived_item", "archived_item_counts")))
+
+
+def create_triggers(target, connection, **kw):
+    """Creates the triggers that maintain the counters, if they don't exist yet"""
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in TRIGGERS[target.name]:
+        connection.execute(statement)
+
+
+def init_app(app):
+    """Creates the triggers along with the item tables"""
+    for model in (BucketlistItem, ArchivedItem):
+        if not event.contains(model.__table__, "after_create", create_triggers):
+            event.listen(model.__table__, "after_create", create_triggers)
+
+
+def recompute_counts():
+    """Recomputes the counters of every bucketlist from its items"""
+    connection = db.session.connection()
+    for model in (BucketlistItem, ArchivedItem):
+        create_triggers(model.__table__, connection)
+    count = ("(SELECT count(*) FROM bucketlist_item WHERE bucketlist_item.bucket = bucketlist.id%s)"
+             " + (SELECT count(*) FROM archived_item WHERE archived_item.bucket = bucketlist.id%s)")
+    connection.execute(
+        "UPDATE bucketlist SET item_count = " + count % ("", "") + ", done_count = " +
+        count % (" AND bucketlist_item.done = 1", " AND archived_item.done = 1"))
+    db.session.commit()
@@ -0,0 +1,73 @@
+import json
+from datetime import datetime
+from flask import current_app, jsonify as flask_jsonify, request
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+'''
+JSON encoding of the API responses.
+
+Compact responses are encoded by the fastest JSON library installed,
+ujson when available and the stdlib otherwise. Both are configured to
+produce the same bytes: sorted keys, no whitespace and ASCII escapes.
+Dates are formatted when the data is exported, so the encoders only ever
+see plain types and never call back into Python.
+'''
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+          "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+DATE_FORMATS = ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d")
+
+
+def format_date(value):
+    """Formats a naive UTC datetime like Flask's encoder does, e.g. 'Sun, 06 Nov 1994 08:49:37 GMT'"""
+    if value is None:
+        return None
+    return "%s, %02d %s %04d %02d:%02d:%02d GMT" % (
+        WEEKDAYS[value.weekday()], value.day, MONTHS[value.month - 1], value.year,
+        value.hour, value.minute, value.second)
+
+
+def parse_date(value):
+    """Parses an ISO 8601 date or datetime, e.g. '2016-11-06' or '2016-11-06T08:49:37'"""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except (TypeError, ValueError):
+            pass
+    raise ValueError("Invalid date: %r" % (value,))
+
+
+def _stdlib_dumps(data):
+    return json.dumps(data, sort_keys=True, separators=(",", ":"))
+
+
+def _ujson_dumps(data):
+    return ujson.dumps(data, sort_keys=True, escape_forward_slashes=False)
+
+
+BACKENDS = {"json": _stdlib_dumps}
+if ujson is not None:
+    BACKENDS["ujson"] = _ujson_dumps
+
+
+def dumps(data):
+    """Encodes data compactly with the JSON_BACKEND, or the fastest one installed"""
+    backend = current_app.config.get("JSON_BACKEND") or ("ujson" if ujson is not None else "json")
+    return BACKENDS[backend](data)
+
+
+def jsonify(*args, **kwargs):
+    """
+    Works like flask.jsonify, but encodes compact responses with 'dumps'.
+
+    Pretty printed responses (JSONIFY_PRETTYPRINT_REGULAR) are left to Flask.
+    """
+    if current_app.config.get("JSONIFY_PRETTYPRINT_REGULAR") and not request.is_xhr:
+        return flask_jsonify(*args, **kwargs)
+    data = args[0] if len(args) == 1 else args or kwargs
+    return current_app.response_class((dumps(data), "\n"), mimetype="application/json")
@@ -0,0 +1,75 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+'''
+Password hashing off the request thread.
+
+Hashes are computed in a small pool of worker processes so that a burst
+of logins doesn't hold the GIL and starve the cheap CRUD requests. A pool
+size of 0 hashes inline, which is what the tests use.
+'''
+
+
+class HashingService(object):
+    """
+    Hashes and checks passwords with a fixed method and cost
+    in a bounded process pool
+    """
+    def __init__(self, method, iterations, pool_size, timeout=30):
+        self.method = "%s:%d" % (method, iterations)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.pool = None
+        self.pid = None
+        self.lock = threading.Lock()
+        # limits the jobs waiting on the pool, further callers block here
+        self.slots = threading.BoundedSemaphore(max(pool_size, 1) * 4)
+
+    def _get_pool(self):
+        with self.lock:
+            # a forked worker must not share its parent's pool
+            if self.pool is None or self.pid != os.getpid():
+                self.pool = multiprocessing.Pool(self.pool_size)
+                self.pid = os.getpid()
+                atexit.register(self.pool.terminate)
+            return self.pool
+
+    def _run(self, func, *args):
+        if self.pool_size <= 0:
+            return func(*args)
+        with self.slots:
+            return self._get_pool().apply_async(func, args).get(self.timeout)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def check(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Tells if a hash was made with another method or cost"""
+        return pwhash.split("$", 1)[0] != self.method
+
+    def close(self):
+        with self.lock:
+            if self.pool is not None and self.pid == os.getpid():
+                self.pool.terminate()
+            self.pool = None
+
+
+_services = {}
+
+
+def get_hasher():
+    """Returns the hashing service for the current config, built only once"""
+    config = current_app.config
+    key = (config.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256"),
+           config.get("PASSWORD_HASH_ITERATIONS", 50000),
+           config.get("PASSWORD_HASH_POOL_SIZE", 0))
+    if key not in _services:
+        _services[key] = HashingService(*key)
+    return _services[key]
@@ -0,0 +1,245 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from bucketlist.auth import token_cache
+from bucketlist.cache import get_cache
+
+'''
+Per-endpoint request metrics in the Prometheus text format.
+
+Every request records its latency, the number of SQL statements it ran,
+the time spent in them and the size of its response. With METRICS_PATH,
+each process merges its measurements into a SQLite file every few
+seconds, so the counters of the worker processes add up and never go
+backwards when a worker is replaced. Without it they are private to the
+process, like the memory response cache.
+'''
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Metrics(object):
+    """
+    Accumulates the measurements of finished requests per endpoint.
+
+    The measurements are kept as (metric, endpoint, label) counters. With
+    a 'path', they are merged into a SQLite file every 'interval' seconds
+    and read back from it.
+    """
+    def __init__(self, path=None, interval=5, buckets=BUCKETS):
+        self.path = path
+        self.interval = interval
+        self.buckets = buckets
+        self.counters = {}
+        # the cache counters as of the last time they were counted
+        self.reported = {}
+        self.flushed = time.time()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def _connection(self):
+        # connections are never shared across threads or forked processes
+        if getattr(self.local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("CREATE TABLE IF NOT EXISTS counter (metric TEXT, endpoint TEXT, "
+                               "label TEXT, value REAL, PRIMARY KEY (metric, endpoint, label))")
+            self.local.connection, self.local.pid = connection, os.getpid()
+        return self.local.connection
+
+    def _add(self, key, value):
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, endpoint, status, seconds, queries, db_seconds, size):
+        """Counts a finished request and returns whether a flush is due"""
+        bucket = next((str(bound) for bound in self.buckets if seconds <= bound), "+Inf")
+        with self.lock:
+            self._add(("duration_bucket", endpoint, bucket), 1)
+            self._add(("duration_sum", endpoint, ""), seconds)
+            self._add(("requests", endpoint, str(status)), 1)
+            self._add(("db_queries", endpoint, ""), queries)
+            self._add(("db_seconds", endpoint, ""), db_seconds)
+            self._add(("response_bytes", endpoint, ""), size)
+            due = self.path is not None and time.time() - self.flushed >= self.interval
+            if due:
+                self.flushed = time.time()
+        return due
+
+    def count_caches(self, caches):
+        """Adds what the hits and misses of each (name, stats) cache grew by"""
+        with self.lock:
+            for name, stats in caches:
+                for key in ("hits", "misses"):
+                    last = self.reported.get((name, key), 0)
+                    # a cleared cache starts counting from 0 again
+                    grown = stats[key] - last if stats[key] >= last else stats[key]
+                    self._add(("cache_" + key, name, ""), grown)
+                    self.reported[(name, key)] = stats[key]
+
+    def flush(self):
+        """Merges the counters of this process into the SQLite file"""
+        with self.lock:
+            if self.path is None:
+                return
+            counters, self.counters = self.counters, {}
+            self.flushed = time.time()
+        if not counters:
+            return
+        connection = self._connection()
+        connection.execute("BEGIN")
+        for (metric, endpoint, label), value in counters.items():
+            connection.execute("INSERT OR IGNORE INTO counter VALUES (?, ?, ?, 0)",
+                               (metric, endpoint, label))
+            connection.execute("UPDATE counter SET value = value + ? "
+                               "WHERE metric = ? AND endpoint = ? AND label = ?",
+                               (value, metric, endpoint, label))
+        connection.execute("COMMIT")
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except sqlite3.Error:
+            logger.exception("Could not write the metrics")
+
+    def totals(self):
+        """Returns the counters, of every process sharing the file with a 'path'"""
+        if self.path is None:
+            with self.lock:
+                return dict(self.counters)
+        self.flush()
+        return dict(((metric, endpoint, label), value) for metric, endpoint, label, value in
+                    self._connection().execute("SELECT * FROM counter"))
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.reported.clear()
+        if self.path is not None:
+            self._connection().execute("DELETE FROM counter")
+
+    def render(self):
+        """Returns the metrics in the Prometheus text exposition format"""
+        totals = self.totals()
+
+        def values(metric):
+            return sorted((endpoint, label, value)
+                          for (name, endpoint, label), value in totals.items() if name == metric)
+
+        lines = ["# HELP bucketlist_request_duration_seconds Request latency.",
+                 "# TYPE bucketlist_request_duration_seconds histogram"]
+        for name, _, total in values("duration_sum"):
+            cumulative = 0
+            for bound in [str(bound) for bound in self.buckets] + ["+Inf"]:
+                cumulative += totals.get(("duration_bucket", name, bound), 0)
+                lines.append('bucketlist_request_duration_seconds_bucket{endpoint="%s",le="%s"} %d'
+                             % (name, bound, cumulative))
+            lines.append('bucketlist_request_duration_seconds_sum{endpoint="%s"} %.6f'
+                         % (name, total))
+            lines.append('bucketlist_request_duration_seconds_count{endpoint="%s"} %d'
+                         % (name, cumulative))
+
+        lines += ["# HELP bucketlist_requests_total Finished requests.",
+                  "# TYPE bucketlist_requests_total counter"]
+        lines += ['bucketlist_requests_total{endpoint="%s",status="%s"} %d' % row
+                  for row in values("requests")]
+        for metric, key, description, fmt in (
+                ("db_queries_total", "db_queries", "SQL statements executed.", "%d"),
+                ("db_seconds_total", "db_seconds", "Time spent executing SQL.", "%.6f"),
+                ("response_bytes_total", "response_bytes", "Size of the response bodies.", "%d")):
+            lines += ["# HELP bucketlist_%s %s" % (metric, description),
+                      "# TYPE bucketlist_%s counter" % metric]
+            lines += [('bucketlist_%s{endpoint="%s"} ' + fmt) % (metric, name, value)
+                      for name, _, value in values(key)]
+
+        for key in ("hits", "misses"):
+            for name, _, value in values("cache_" + key):
+                lines += ["# TYPE bucketlist_%s_%s_total counter" % (name, key),
+                          "bucketlist_%s_%s_total %d" % (name, key, value)]
+        return "\n".join(lines) + "\n"
+
+
+_metrics = {}
+
+
+def get_metrics():
+    """Returns the metrics for the current config"""
+    path = current_app.config.get("METRICS_PATH")
+    if path not in _metrics:
+        _metrics[path] = Metrics(path)
+    return _metrics[path]
+
+
+def count_caches(metrics):
+    """Counts the hits and misses of the caches of the current app"""
+    caches = [("token_cache", token_cache.stats())]
+    response_cache = get_cache()
+    if response_cache is not None:
+        caches.append(("response_cache", response_cache.stats()))
+    metrics.count_caches(caches)
+
+
+# the statements of the request being handled by the current thread
+_current = threading.local()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_current, "active", False):
+        conn.info["query_start"] = time.time()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_start", None)
+    if getattr(_current, "active", False) and started is not None:
+        _current.db_seconds += time.time() - started
+        _current.queries += 1
+
+
+def start_request():
+    if current_app.config.get("METRICS"):
+        _current.active = True
+        _current.start = time.time()
+        _current.queries = 0
+        _current.db_seconds = 0.0
+
+
+def finish_request(response):
+    if not getattr(_current, "active", False):
+        return response
+    _current.active = False
+    # streamed responses have no length until they have been sent
+    size = response.content_length if not response.is_streamed else None
+    metrics = get_metrics()
+    due = metrics.observe(request.endpoint or "unmatched", response.status_code,
+                          time.time() - _current.start, _current.queries,
+                          _current.db_seconds, size or 0)
+    if due:
+        count_caches(metrics)
+        # the request doesn't wait for the file
+        thread = threading.Thread(target=metrics._flush_quietly)
+        thread.daemon = True
+        thread.start()
+    if current_app.config.get("QUERY_COUNT_HEADER"):
+        response.headers["X-Query-Count"] = str(_current.queries)
+    return response
+
+
+def abandon_request(exc=None):
+    # after_request is skipped when a view raises
+    _current.active = False
+
+
+def init_app(app):
+    """Records the metrics of the requests of an app"""
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.teardown_request(abandon_request)
@@ -1,8 +1,11 @@
 from datetime import datetime
 from flask import url_for
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import aliased, load_only
 from bucketlist import db
+from bucketlist.encoding import format_date
 from bucketlist.exceptions import ValidationError
+from bucketlist.hashing import get_hasher
 
 
 class User(db.Model):
@@ -12,18 +15,23 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, index=True)
     password_hash = db.Column(db.String(128))
+    # the database deletes a user's bucketlists and items (ON DELETE CASCADE)
     bucketlists = db.relationship("Bucketlist", backref="user", lazy="dynamic",
-                                  cascade="all, delete-orphan")
+                                  cascade="all, delete-orphan", passive_deletes=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_hasher().hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return get_hasher().check(self.password_hash, password)
+
+    def needs_rehash(self):
+        """Tells if the password hash was made with outdated parameters"""
+        return get_hasher().needs_rehash(self.password_hash)
 
     def export_data(self):
         """Specifies the response data returned to the client"""
-        return url_for("all_bucketlists", id=self.id, _external=True)
+        return url_for("api.all_bucketlists", id=self.id, _external=True)
 
     def import_data(self, data):
         """Validates the request data from the client"""
@@ -42,30 +50,117 @@ class Bucketlist(db.Model):
     """
     Models the bucketlist class
     """
+    __table_args__ = (
+        # serves the keyset pagination of a user's bucketlists
+        db.Index("ix_bucketlist_created_by_id", "created_by", "id"),
+        # serves the latest change of a user's bucketlists
+        db.Index("ix_bucketlist_created_by_date_modified", "created_by", "date_modified"),
+        # a user's bucketlists have unique names
+        db.Index("uq_bucketlist_created_by_name", "created_by", "name", unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), index=True)
     date_created = db.Column(db.DateTime, default=datetime.now)
     date_modified = db.Column(db.DateTime, default=datetime.now,
                               onupdate=datetime.now)
-    created_by = db.Column(db.Integer, db.ForeignKey("user.id"))
-    items = db.relationship("BucketlistItem", backref="bucketlist",
-                            lazy="dynamic", cascade="all, delete-orphan")
+    created_by = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"))
+    # maintained by the triggers in bucketlist.counters
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    done_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # the database deletes a bucketlist's items (ON DELETE CASCADE)
+    items = db.relationship("BucketlistItem", backref="bucketlist", lazy="dynamic",
+                            cascade="all, delete-orphan", passive_deletes=True)
 
-    def export_data(self):
-        """Specifies the data to be returned to the client"""
-        return {
-            "id": self.id,
-            "name": self.name.title(),
-            "items": [{
-                "id": item.id,
-                "name": item.name,
-                "date_created": item.date_created,
-                "date_modified": item.date_modified,
-                "done": item.done} for item in self.items],
-            "date_created": self.date_created,
-            "date_modified": self.date_modified,
-            "created_by": self.created_by
-        }
+    # the fields clients can ask for, and those they get by default
+    FIELDS = ("id", "name", "items", "item_count", "done_count", "date_created",
+              "date_modified", "created_by")
+    DEFAULT_FIELDS = ("id", "name", "items", "date_created", "date_modified", "created_by")
+    COLUMNS = ("id", "name", "item_count", "done_count", "date_created", "date_modified",
+               "created_by")
+
+    def export_data(self, items=None, fields=DEFAULT_FIELDS, titled=True):
+        """
+        Specifies the data to be returned to the client
+
+        'items' can be passed in when they have already been loaded,
+        otherwise they are queried from the relationship. Only the
+        attributes in 'fields' are read, so the other columns can be
+        left unloaded. 'titled' title-cases the name for display.
+        """
+        data = {}
+        for field in fields:
+            if field == "items":
+                if items is None:
+                    items = self.items
+                data["items"] = [item.export_summary() for item in items]
+            elif field == "name":
+                data["name"] = self.name.title() if titled else self.name
+            elif field in ("date_created", "date_modified"):
+                data[field] = format_date(getattr(self, field))
+            else:
+                data[field] = getattr(self, field)
+        return data
+
+    @staticmethod
+    def select_fields(fields=None, embed=None):
+        """
+        Returns the fields to export for the 'fields' and 'embed' arguments.
+
+        'fields' is a comma separated list of FIELDS and 'embed' is one of
+        'items', 'count' (the item and done counts) or 'none'. Items are
+        embedded by default unless 'fields' leaves them out.
+        """
+        if fields is None:
+            selected = list(Bucketlist.DEFAULT_FIELDS)
+        else:
+            selected = [field.strip() for field in fields.split(",") if field.strip()]
+            unknown = [field for field in selected if field not in Bucketlist.FIELDS]
+            if unknown or not selected:
+                raise ValidationError("Unknown fields: " + ", ".join(unknown))
+        if embed is not None:
+            if embed not in ("items", "count", "none"):
+                raise ValidationError("Embed one of items, count or none")
+            selected = [field for field in selected
+                        if field not in ("items", "item_count", "done_count")]
+            if embed == "items":
+                selected.append("items")
+            elif embed == "count":
+                selected.extend(["item_count", "done_count"])
+        return tuple(selected)
+
+    @staticmethod
+    def load_fields(query, fields):
+        """Restricts a query to the columns the fields need"""
+        return query.options(load_only(*[field for field in fields
+                                         if field in Bucketlist.COLUMNS] or ["id"]))
+
+    @staticmethod
+    def export_many(bucketlists, fields=DEFAULT_FIELDS, include_archived=False, titled=True):
+        """
+        Exports several bucketlists, loading the items of all of them
+        with a single IN query instead of one query per bucketlist
+        """
+        items = {}
+        ids = [bucketlist.id for bucketlist in bucketlists]
+        if ids and "items" in fields:
+            Item = BucketlistItem.source(include_archived)
+            query = db.session.query(Item).filter(Item.bucket.in_(ids))
+            for item in query.order_by(Item.id):
+                items.setdefault(item.bucket, []).append(item)
+        return [bucketlist.export_data(items.get(bucketlist.id, []), fields, titled)
+                for bucketlist in bucketlists]
+
+    @staticmethod
+    def existing_names(user_id, names, chunk=500):
+        """Returns which of 'names' are already used by a user's bucketlists"""
+        names, existing = list(set(names)), set()
+        for start in range(0, len(names), chunk):
+            query = db.session.query(Bucketlist.name).filter(
+                Bucketlist.created_by == user_id,
+                Bucketlist.name.in_(names[start:start + chunk]))
+            existing.update(name for name, in query)
+        return existing
 
     def import_data(self, data):
         """Validates the request data from the client"""
@@ -88,18 +183,85 @@ class BucketlistItem(db.Model):
     """
     Models the item class
     """
+    __table_args__ = (
+        # serves the latest change of a user's items
+        db.Index("ix_bucketlist_item_created_by_date_modified", "created_by", "date_modified"),
+        # the items of a bucketlist have unique names
+        db.Index("uq_bucketlist_item_bucket_name", "bucket", "name", unique=True),
+        # serves loading the items of bucketlists in id order
+        db.Index("ix_bucketlist_item_bucket_id", "bucket", "id"),
+        # serve filtering and sorting the items of a bucketlist, the id
+        # (the rowid) is implicitly the last column of each
+        db.Index("ix_bucketlist_item_bucket_done", "bucket", "done"),
+        db.Index("ix_bucketlist_item_bucket_date_created", "bucket", "date_created"),
+        db.Index("ix_bucketlist_item_bucket_date_modified", "bucket", "date_modified"),
+        # ids are never reused, so archived items keep theirs
+        {"sqlite_autoincrement": True},
+    )
+
+    # the columns the items of a bucketlist can be sorted by
+    SORTS = ("id", "name", "date_created", "date_modified")
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.Text, index=True)
     date_created = db.Column(db.DateTime, default=datetime.now)
     date_modified = db.Column(db.DateTime, default=datetime.now,
                               onupdate=datetime.now)
     done = db.Column(db.Boolean, default=False)
-    bucket = db.Column(db.Integer, db.ForeignKey("bucketlist.id"))
-    created_by = db.Column(db.Integer, db.ForeignKey("user.id"))
+    bucket = db.Column(db.Integer, db.ForeignKey("bucketlist.id", ondelete="CASCADE"))
+    created_by = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"))
 
     def export_data(self):
         """Specifies the data to be returned to the client"""
-        return url_for("all_bucketlists", id=self.id, _external=True)
+        return url_for("api.all_bucketlists", id=self.id, _external=True)
+
+    @staticmethod
+    def source(include_archived=False):
+        """
+        Returns the entity to read items from: BucketlistItem, or an alias
+        of it over the union of the items and the archived items
+        """
+        global _all_items
+        if not include_archived:
+            return BucketlistItem
+        if _all_items is None:
+            columns = ("id", "name", "date_created", "date_modified", "done", "bucket",
+                       "created_by")
+            union = union_all(
+                select([BucketlistItem.__table__.c[column] for column in columns]),
+                select([ArchivedItem.__table__.c[column] for column in columns]))
+            _all_items = aliased(BucketlistItem, union.alias("any_item"))
+        return _all_items
+
+    def export_summary(self):
+        """Specifies the item data listed in responses"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "date_created": format_date(self.date_created),
+            "date_modified": format_date(self.date_modified),
+            "done": self.done}
+
+    @staticmethod
+    def _names_query(bucket_id, names, chunk=500):
+        """Yields the (id, name) of a bucketlist's items among 'names'"""
+        names = list(names)
+        for start in range(0, len(names), chunk):
+            query = db.session.query(BucketlistItem.id, BucketlistItem.name).filter(
+                BucketlistItem.bucket == bucket_id,
+                BucketlistItem.name.in_(names[start:start + chunk]))
+            for row in query:
+                yield row
+
+    @staticmethod
+    def existing_names(bucket_id, names):
+        """Returns which of 'names' are already used in a bucketlist"""
+        return set(name for _, name in BucketlistItem._names_query(bucket_id, set(names)))
+
+    @staticmethod
+    def ids_by_name(bucket_id, names):
+        """Maps item names in a bucketlist to their ids"""
+        return dict((name, id) for id, name in BucketlistItem._names_query(bucket_id, names))
 
     def import_data(self, data):
         """Validates the request data from the client"""
@@ -108,7 +270,10 @@ class BucketlistItem(db.Model):
                 return "Invalid"
             else:
                 self.name = data["name"]
-            if data["done"].strip() == "yes":
+            # exported items carry done as a boolean
+            if data["done"] is True or data["done"] is False:
+                self.done = data["done"]
+            elif data["done"].strip() == "yes":
                 self.done = True
             else:
                 self.done = False
@@ -126,3 +291,44 @@ class BucketlistItem(db.Model):
             elif data.get("done").strip() == "yes":
                 self.done = True
         return self
+
+
+class ArchivedItem(db.Model):
+    """
+    Models the done items moved out of the items table by bucketlist.archive
+    """
+    __table_args__ = (
+        # serves reading the archived items of bucketlists
+        db.Index("ix_archived_item_bucket_id", "bucket", "id"),
+    )
+
+    # the id the item had, and gets back when it's restored
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.Text)
+    date_created = db.Column(db.DateTime)
+    date_modified = db.Column(db.DateTime)
+    done = db.Column(db.Boolean)
+    bucket = db.Column(db.Integer, db.ForeignKey("bucketlist.id", ondelete="CASCADE"))
+    created_by = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"))
+    date_archived = db.Column(db.DateTime, default=datetime.now)
+
+
+# the union of the items and the archived items, see BucketlistItem.source
+_all_items = None
+
+
+class Deletion(db.Model):
+    """
+    Models the log of deleted bucketlists and items, read by the sync feed
+    """
+    __table_args__ = (
+        # serves reading a user's deletions since a sync token
+        db.Index("ix_deletion_user_id_id", "user_id", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"))
+    # "bucketlist" or "item", a bucketlist's items go with it
+    kind = db.Column(db.String(10))
+    object_id = db.Column(db.Integer)
+    date_deleted = db.Column(db.DateTime, default=datetime.now)
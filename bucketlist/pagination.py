@@ -0,0 +1,130 @@
+import base64
+import binascii
+import json
+import operator
+from sqlalchemy import and_, or_
+from bucketlist.exceptions import ValidationError
+
+
+def encode_cursor(created_by, key, direction="next"):
+    """
+    Packs the position of a row into an opaque, url-safe cursor.
+
+    'direction' is either 'next' (rows after the key) or 'prev'
+    (rows before the key)
+    """
+    raw = json.dumps([created_by, key, direction], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Unpacks a cursor into a (created_by, key, direction) tuple"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_by, key, direction = json.loads(raw)
+    except (TypeError, ValueError, binascii.Error):
+        raise ValidationError("Invalid cursor")
+    if direction not in ("next", "prev"):
+        raise ValidationError("Invalid cursor")
+    return created_by, key, direction
+
+
+def seek(column, tiebreak, key, after=True):
+    """
+    Returns the condition for the rows after (or before) 'key', a
+    [value, tiebreak value] pair, in the order of 'column' and then
+    of the unique 'tiebreak' column.
+
+    The row value comparison (column, tiebreak) > (value, tiebreak value)
+    needs SQLite 3.15, so it's spelled out, with a range on 'column'
+    the index can seek to.
+    """
+    compare = operator.gt if after else operator.lt
+    bound = operator.ge if after else operator.le
+    value, tiebreak_value = key
+    return and_(bound(column, value),
+                or_(compare(column, value), compare(tiebreak, tiebreak_value)))
+
+
+def keyset_page(query, column, limit, key=None, direction="next"):
+    """
+    Returns a page of rows ordered by 'column' as (rows, next_key, prev_key).
+
+    Instead of an OFFSET and a COUNT, the page is fetched by seeking past
+    'key' on the index and reading one extra row to find out whether
+    another page follows. next_key/prev_key are None on the last/first page.
+    """
+    if key is None:
+        rows = query.order_by(column).limit(limit + 1).all()
+        has_next, has_prev = len(rows) > limit, False
+    elif direction == "next":
+        rows = query.filter(column > key).order_by(column).limit(limit + 1).all()
+        has_next, has_prev = len(rows) > limit, True
+    else:
+        rows = query.filter(column < key).order_by(column.desc()).limit(limit + 1).all()
+        has_next, has_prev = True, len(rows) > limit
+        rows = list(reversed(rows[:limit]))
+    rows = rows[:limit]
+    if not rows:
+        return rows, None, None
+    return (rows,
+            getattr(rows[-1], column.key) if has_next else None,
+            getattr(rows[0], column.key) if has_prev else None)
+
+
+def sorted_page(query, column, tiebreak, limit, key=None, direction="next",
+                descending=False):
+    """
+    Returns a page of rows ordered by 'column' and then by the unique
+    'tiebreak' column as (rows, next_key, prev_key).
+
+    Works like keyset_page for columns that aren't unique, so the keys
+    are [value, tiebreak value] pairs. 'descending' reverses the order.
+    """
+    columns = [column] if column is tiebreak else [column, tiebreak]
+    if key is not None:
+        # rows after the key in the order of the page
+        after = (direction == "next") != descending
+        if len(columns) == 1:
+            query = query.filter(column > key[0] if after else column < key[0])
+        else:
+            query = query.filter(seek(column, tiebreak, key[:2], after))
+    ascending = (key is None or direction == "next") != descending
+    rows = query.order_by(*[c if ascending else c.desc() for c in columns]).limit(limit + 1).all()
+    if key is None:
+        has_next, has_prev = len(rows) > limit, False
+    elif direction == "next":
+        has_next, has_prev = len(rows) > limit, True
+    else:
+        has_next, has_prev = True, len(rows) > limit
+        rows = list(reversed(rows[:limit]))
+    rows = rows[:limit]
+    if not rows:
+        return rows, None, None
+
+    def position_of(row):
+        return [getattr(row, column.key), getattr(row, tiebreak.key)]
+    return (rows,
+            position_of(rows[-1]) if has_next else None,
+            position_of(rows[0]) if has_prev else None)
+
+
+def ranked_page(fetch, limit, key=None, direction="next"):
+    """
+    Returns a page of a ranking of ids as (ids, next_key, prev_key).
+
+    'fetch(offset, limit)' returns at most 'limit' ids of the ranking from
+    its 'offset'th one, so only the page and one extra id are read. The
+    keys are positions in the ranking, so a page of search results stays
+    stable while the client follows the links.
+    """
+    start = key or 0
+    if direction == "prev":
+        start = max(start - limit, 0)
+    ids = fetch(start, limit + 1)
+    has_next = len(ids) > limit
+    ids = ids[:limit]
+    return (ids,
+            start + len(ids) if has_next else None,
+            start if start > 0 else None)
@@ -0,0 +1,124 @@
+import re
+from sqlalchemy import event, text
+from bucketlist import db
+from bucketlist.models import Bucketlist, BucketlistItem
+
+'''
+Full-text search over bucketlist and item names.
+
+On SQLite both tables get an FTS5 index which is kept in sync by
+triggers, so every write path (ORM or not) updates it. Other databases
+fall back to a plain ilike on the bucketlist name.
+
+The owner of every row is indexed next to its name, so a search only
+matches the rows of its user before they are ranked, and only the page
+of results asked for is read.
+'''
+
+INDEXES = {
+    "bucketlist": "bucketlist_fts",
+    "bucketlist_item": "bucketlist_item_fts",
+}
+
+
+def _index_ddl(table, index):
+    """Returns the statements that create the index of a table and its triggers"""
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS %(index)s USING fts5("
+        "name, created_by, content='%(table)s', content_rowid='id')",
+        "CREATE TRIGGER IF NOT EXISTS %(index)s_ai AFTER INSERT ON %(table)s BEGIN "
+        "INSERT INTO %(index)s(rowid, name, created_by) "
+        "VALUES (new.id, new.name, new.created_by); END",
+        "CREATE TRIGGER IF NOT EXISTS %(index)s_ad AFTER DELETE ON %(table)s BEGIN "
+        "INSERT INTO %(index)s(%(index)s, rowid, name, created_by) "
+        "VALUES ('delete', old.id, old.name, old.created_by); END",
+        "CREATE TRIGGER IF NOT EXISTS %(index)s_au AFTER UPDATE OF name, created_by "
+        "ON %(table)s BEGIN "
+        "INSERT INTO %(index)s(%(index)s, rowid, name, created_by) "
+        "VALUES ('delete', old.id, old.name, old.created_by); "
+        "INSERT INTO %(index)s(rowid, name, created_by) "
+        "VALUES (new.id, new.name, new.created_by); END",
+    ]
+    return [statement % {"table": table, "index": index} for statement in statements]
+
+
+def create_index(target, connection, **kw):
+    """Creates the search index of a table, if it doesn't exist yet"""
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in _index_ddl(target.name, INDEXES[target.name]):
+        connection.execute(statement)
+
+
+def drop_index(target, connection, **kw):
+    """Drops the search index of a table along with the table"""
+    if connection.dialect.name != "sqlite":
+        return
+    connection.execute("DROP TABLE IF EXISTS " + INDEXES[target.name])
+
+
+for model in (Bucketlist, BucketlistItem):
+    event.listen(model.__table__, "after_create", create_index)
+    event.listen(model.__table__, "before_drop", drop_index)
+
+
+def rebuild_index():
+    """Recreates the contents of the search indexes from their tables"""
+    connection = db.session.connection()
+    for model in (Bucketlist, BucketlistItem):
+        create_index(model.__table__, connection)
+        if connection.dialect.name == "sqlite":
+            index = INDEXES[model.__tablename__]
+            connection.execute("INSERT INTO %s(%s) VALUES ('rebuild')" % (index, index))
+    db.session.commit()
+
+
+def match_expression(q, user_id=None):
+    """
+    Turns free text into an FTS5 query where every word is
+    matched as a prefix, e.g. 'trip par' -> '"trip"* "par"*',
+    and restricts it to the rows of a user when one is given
+    """
+    words = re.findall(r"\w+", q, re.UNICODE)
+    expression = " ".join('"' + word + '"*' for word in words)
+    if not expression or user_id is None:
+        return expression
+    return 'created_by : "%d" AND name : (%s)' % (user_id, expression)
+
+
+# the owner column weighs nothing in the ranking
+SEARCH_SQL = text("""
+    SELECT matches.id, min(matches.score) AS best
+    FROM (
+        SELECT rowid AS id, bm25(bucketlist_fts, 1.0, 0.0) AS score
+        FROM bucketlist_fts WHERE bucketlist_fts MATCH :q
+        UNION ALL
+        SELECT bucketlist_item.bucket AS id, bm25(bucketlist_item_fts, 1.0, 0.0) AS score
+        FROM bucketlist_item_fts
+        JOIN bucketlist_item ON bucketlist_item.id = bucketlist_item_fts.rowid
+        WHERE bucketlist_item_fts MATCH :q
+    ) AS matches
+    GROUP BY matches.id
+    ORDER BY best, matches.id
+    LIMIT :limit OFFSET :offset
+""")
+
+
+def search_bucketlists(user_id, q, offset=0, limit=None):
+    """
+    Returns the ids of a user's bucketlists whose name, or the name
+    of one of their items, matches 'q', best match first, from the
+    'offset'th match on and at most 'limit' of them
+    """
+    if db.engine.dialect.name != "sqlite":
+        query = db.session.query(Bucketlist.id).filter(
+            Bucketlist.created_by == user_id,
+            Bucketlist.name.ilike("%" + q + "%")).order_by(Bucketlist.id)
+        return [row.id for row in query.offset(offset).limit(limit)]
+    expression = match_expression(q, user_id)
+    if not expression:
+        return []
+    # a negative limit is no limit in SQLite
+    rows = db.session.execute(SEARCH_SQL, {"q": expression, "offset": offset,
+                                           "limit": -1 if limit is None else limit})
+    return [row.id for row in rows]
@@ -0,0 +1,34 @@
+from gunicorn.app.base import BaseApplication
+from bucketlist import db
+
+'''
+Runs the app under gunicorn's pre-forking server, see 'manage.py serve'.
+'''
+
+
+def dispose_engine(server, worker):
+    """Drops pooled connections so no two processes ever share one"""
+    db.get_engine(server.app.application).dispose()
+
+
+class Server(BaseApplication):
+    """
+    A gunicorn server for the app.
+
+    The app is imported once in the master and forked into the workers,
+    which recycle themselves after 'max_requests' requests.
+    """
+    def __init__(self, application, options=None):
+        self.application = application
+        self.options = dict({"preload_app": True,
+                             "pre_fork": dispose_engine,
+                             "post_fork": dispose_engine}, **(options or {}))
+        super(Server, self).__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
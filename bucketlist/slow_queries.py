@@ -0,0 +1,239 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from flask import current_app, g, request, has_app_context, has_request_context
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
+
+'''
+Slow-query log.
+
+Every statement is timed and aggregated under its fingerprint, the
+statement with its literals and IN lists collapsed, so the same query
+with different arguments counts once. Statements slower than
+SLOW_QUERY_THRESHOLD seconds are also logged one by one with the view
+and user they ran for. The aggregates and the slow statements are
+buffered and merged into the SQLite file at SLOW_QUERY_LOG_PATH by a
+background thread, where 'manage.py slow_queries' reads them, so no
+request waits on the file. The log is off unless SLOW_QUERY_THRESHOLD
+is set.
+'''
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|:\w+\b|%s")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """Returns a statement with its literals and parameter lists collapsed"""
+    statement = _SPACE.sub(" ", statement).strip()
+    statement = _PLACEHOLDERS.sub("?", statement)
+    statement = _LITERALS.sub("?", statement)
+    return _LISTS.sub("(...)", statement)
+
+
+def parameter_shape(parameters, executemany=False):
+    """Describes the types of the bound parameters without their values"""
+    if executemany:
+        if not parameters:
+            return "0 x ()"
+        return "%d x %s" % (len(parameters), parameter_shape(parameters[0]))
+    if isinstance(parameters, dict):
+        return "{%s}" % ", ".join("%s: %s" % (key, type(value).__name__)
+                                  for key, value in sorted(parameters.items()))
+    # runs of the same type, e.g. the ids of an IN list, are counted
+    runs = []
+    for value in parameters or ():
+        name = type(value).__name__
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return "(%s)" % ", ".join(name if count == 1 else "%s x %d" % (name, count)
+                              for name, count in runs)
+
+
+class QueryLog(object):
+    """
+    Aggregates the count and time of statements per fingerprint.
+
+    The aggregates are merged into a SQLite file every 'interval'
+    seconds so every worker process contributes to the same table.
+    At most 'backlog' slow statements are kept between two merges.
+    """
+    def __init__(self, path=None, interval=5, backlog=1000):
+        self.path = path
+        self.interval = interval
+        self.backlog = backlog
+        self.pending = {}
+        self.slow = []
+        self.fingerprints = {}
+        self.flushed = time.time()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def _connection(self):
+        # connections are never shared across threads or forked processes
+        if getattr(self.local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("CREATE TABLE IF NOT EXISTS fingerprint ("
+                               "fingerprint TEXT PRIMARY KEY, count INTEGER, total REAL, "
+                               "max REAL, slow INTEGER)")
+            connection.execute("CREATE TABLE IF NOT EXISTS slow_query ("
+                               "fingerprint TEXT, parameters TEXT, seconds REAL, "
+                               "view TEXT, user_id INTEGER, created REAL)")
+            self.local.connection, self.local.pid = connection, os.getpid()
+        return self.local.connection
+
+    def _fingerprint(self, statement):
+        cached = self.fingerprints.get(statement)
+        if cached is None:
+            if len(self.fingerprints) > 1000:
+                self.fingerprints.clear()
+            cached = self.fingerprints[statement] = fingerprint(statement)
+        return cached
+
+    def record(self, statement, parameters, executemany, seconds, threshold):
+        """Adds a statement to the aggregates and logs it when it's slow"""
+        key = self._fingerprint(statement)
+        slow = seconds >= threshold
+        with self.lock:
+            entry = self.pending.get(key)
+            if entry is None:
+                entry = self.pending[key] = [0, 0.0, 0.0, 0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3] += slow
+            due = self.path and time.time() - self.flushed >= self.interval
+            if due:
+                self.flushed = time.time()
+        if slow:
+            self.log_slow(key, parameter_shape(parameters, executemany), seconds)
+        if due:
+            # the statement's request doesn't wait for the file
+            thread = threading.Thread(target=self._flush_quietly)
+            thread.daemon = True
+            thread.start()
+
+    def log_slow(self, key, shape, seconds):
+        view = user_id = None
+        if has_request_context():
+            view = request.endpoint
+            user = getattr(g, "user", None)
+            # the identity never triggers a load, unlike user.id
+            identity = inspect(user).identity if user is not None else None
+            user_id = identity[0] if identity else None
+        logger.warning("slow query %.1fms view=%s user=%s params=%s: %s",
+                       1000 * seconds, view, user_id, shape, key)
+        if self.path:
+            with self.lock:
+                if len(self.slow) < self.backlog:
+                    self.slow.append((key, shape, seconds, view, user_id, time.time()))
+
+    def flush(self):
+        """Merges the pending aggregates and slow statements into the SQLite file"""
+        with self.lock:
+            if not self.path:
+                return
+            pending, self.pending = self.pending, {}
+            slow, self.slow = self.slow, []
+            self.flushed = time.time()
+        if not pending and not slow:
+            return
+        connection = self._connection()
+        connection.execute("BEGIN")
+        for key, (count, total, longest, slow_count) in pending.items():
+            connection.execute("INSERT OR IGNORE INTO fingerprint VALUES (?, 0, 0, 0, 0)", (key,))
+            connection.execute("UPDATE fingerprint SET count = count + ?, total = total + ?, "
+                               "max = max(max, ?), slow = slow + ? WHERE fingerprint = ?",
+                               (count, total, longest, slow_count, key))
+        connection.executemany("INSERT INTO slow_query VALUES (?, ?, ?, ?, ?, ?)", slow)
+        connection.execute("COMMIT")
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except sqlite3.Error:
+            logger.exception("Could not write the slow-query log")
+
+    def top(self, limit=20):
+        """Returns the (fingerprint, count, total, max, slow) rows with the most total time"""
+        if self.path:
+            self.flush()
+            return self._connection().execute(
+                "SELECT fingerprint, count, total, max, slow FROM fingerprint "
+                "ORDER BY total DESC LIMIT ?", (limit,)).fetchall()
+        with self.lock:
+            rows = [(key,) + tuple(entry) for key, entry in self.pending.items()]
+        return sorted(rows, key=lambda row: row[2], reverse=True)[:limit]
+
+    def recent(self, limit=20):
+        """Returns the latest slow statements logged to the SQLite file"""
+        if not self.path:
+            return []
+        self.flush()
+        return self._connection().execute(
+            "SELECT fingerprint, parameters, seconds, view, user_id FROM slow_query "
+            "ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+
+    def clear(self):
+        with self.lock:
+            self.pending.clear()
+            del self.slow[:]
+        if self.path:
+            connection = self._connection()
+            connection.execute("DELETE FROM fingerprint")
+            connection.execute("DELETE FROM slow_query")
+
+
+_logs = {}
+
+
+def get_query_log():
+    """Returns the query log for the current config, or None when it's off"""
+    if not has_app_context() or current_app.config.get("SLOW_QUERY_THRESHOLD") is None:
+        return None
+    path = current_app.config.get("SLOW_QUERY_LOG_PATH")
+    if path not in _logs:
+        _logs[path] = QueryLog(path)
+    return _logs[path]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # statements on one connection never nest, and a failed one is overwritten
+    conn.info["slow_query_start"] = time.time()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("slow_query_start", None)
+    if started is None:
+        return
+    seconds = time.time() - started
+    query_log = get_query_log()
+    if query_log is not None:
+        query_log.record(statement, parameters, executemany, seconds,
+                         current_app.config["SLOW_QUERY_THRESHOLD"])
+
+
+def init_app(app):
+    """
+    Times the statements of every engine for the slow-query log, and
+    writes the slow ones to stderr when the log is on outside of tests
+    """
+    # the listeners are on all engines, so apps register them once
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    if app.config.get("SLOW_QUERY_THRESHOLD") is not None and not app.testing and \
+            not any(isinstance(handler, logging.StreamHandler) for handler in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s in %(name)s: %(message)s"))
+        logger.addHandler(handler)
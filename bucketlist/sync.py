@@ -0,0 +1,99 @@
+from bucketlist import db
+from bucketlist.encoding import parse_date
+from bucketlist.exceptions import ValidationError
+from bucketlist.models import Bucketlist, BucketlistItem, Deletion
+from bucketlist.pagination import encode_cursor, decode_cursor, seek
+
+'''
+The incremental sync feed.
+
+A sync token records how far a client has read three streams of a
+user's changes: the bucketlists and the items, each in (date_modified,
+id) order, and the deletion log in id order. Every stream is read by
+seeking past its position on an index, so a sync costs as much as the
+changes since the token, however big the collection is. A row stamped
+before the position but committed after it was read is missed; see
+the README.
+'''
+
+# the bucketlist fields in the feed, the items are synced separately
+FIELDS = ("id", "name", "date_created", "date_modified", "created_by")
+
+
+def encode_token(user_id, bucketlists_key, items_key, deletion_id):
+    """Packs the positions of the three streams into an opaque token"""
+    keys = [[key[0].isoformat(), key[1]] if key else None
+            for key in (bucketlists_key, items_key)]
+    return encode_cursor(user_id, keys + [deletion_id])
+
+
+def decode_token(token, user_id):
+    """
+    Unpacks a token of a user into (bucketlists_key, items_key, deletion_id),
+    raising a ValidationError if it isn't valid
+    """
+    try:
+        created_by, (bucketlists_key, items_key, deletion_id), _ = decode_cursor(token)
+        keys = [[parse_date(key[0]), int(key[1])] if key else None
+                for key in (bucketlists_key, items_key)]
+        if created_by != user_id or not isinstance(deletion_id, (int, type(None))):
+            raise ValueError(token)
+    except (ValueError, TypeError, IndexError):
+        raise ValidationError("Invalid sync token")
+    return keys[0], keys[1], deletion_id
+
+
+def _modified_since(query, model, key, limit):
+    """Returns (rows, key, more) for the rows of a query modified after 'key'"""
+    if key is not None:
+        query = query.filter(seek(model.date_modified, model.id, key))
+    rows = query.order_by(model.date_modified, model.id).limit(limit + 1).all()
+    more, rows = len(rows) > limit, rows[:limit]
+    if rows:
+        key = [rows[-1].date_modified, rows[-1].id]
+    return rows, key, more
+
+
+def changes(user_id, token=None, limit=100):
+    """
+    Returns the changes of a user since a token, or all the data without one.
+
+    At most 'limit' bucketlists, 'limit' items and 'limit' deletions are
+    returned; 'more' tells whether the client should sync again with the
+    new token right away. Deletions should be applied before the changes,
+    as deleted ids can be reused by new rows.
+    """
+    bucketlists_key, items_key, deletion_id = (None, None, None) if token is None else \
+        decode_token(token, user_id)
+
+    deleted = {"bucketlists": [], "items": []}
+    query = db.session.query(Deletion.id, Deletion.kind, Deletion.object_id).filter(
+        Deletion.user_id == user_id)
+    if deletion_id is not None:
+        query = query.filter(Deletion.id > deletion_id)
+    deletions = query.order_by(Deletion.id).limit(limit + 1).all()
+    more_deletions, deletions = len(deletions) > limit, deletions[:limit]
+    # the last deletion read becomes the new position
+    for deletion_id, kind, object_id in deletions:
+        deleted[kind + "s"].append(object_id)
+
+    bucketlists, items, more_bucketlists, more_items = [], [], False, False
+    # a reused id must not come before the deletion of the old row, so the
+    # changes wait until every deletion has been read
+    if not more_deletions:
+        query = Bucketlist.load_fields(Bucketlist.query.filter_by(created_by=user_id), FIELDS)
+        bucketlists, bucketlists_key, more_bucketlists = _modified_since(
+            query, Bucketlist, bucketlists_key, limit)
+        query = BucketlistItem.query.filter_by(created_by=user_id)
+        items, items_key, more_items = _modified_since(query, BucketlistItem, items_key, limit)
+
+    return {"Bucketlists": [bucketlist.export_data(fields=FIELDS) for bucketlist in bucketlists],
+            "Items": [dict(item.export_summary(), bucket=item.bucket) for item in items],
+            "Deleted": deleted,
+            "more": more_bucketlists or more_items or more_deletions,
+            "sync_token": encode_token(user_id, bucketlists_key, items_key, deletion_id)}
+
+
+def record_deletion(user_id, kind, object_id):
+    """Logs the deletion of a bucketlist or an item, to be committed with it"""
+    db.session.add(Deletion(user_id=user_id, kind=kind, object_id=object_id))
@@ -1,10 +1,26 @@
-from flask import jsonify, request, g
-from bucketlist import app, db
+import operator
+from datetime import datetime
+from flask import Blueprint, current_app, request, g, url_for, json, Response, stream_with_context
+from sqlalchemy.exc import IntegrityError
+from werkzeug.http import parse_date as parse_http_date
+from bucketlist import db
 from bucketlist.models import User, Bucketlist, BucketlistItem, ValidationError
 from bucketlist.auth import auth_token, verify_password, generate_auth_token
+from bucketlist.pagination import (encode_cursor, decode_cursor, keyset_page, sorted_page,
+                                   ranked_page)
+from bucketlist.search import search_bucketlists
+from bucketlist.sync import changes, record_deletion
+from bucketlist.archive import include_archived, restore_items
+from bucketlist.cache import cached, invalidates_cache
+from bucketlist.encoding import jsonify, dumps, parse_date
+from bucketlist.metrics import get_metrics, count_caches
+from bucketlist.conditional import (collection_state, bucketlist_state, not_modified,
+                                    precondition_failed, add_validators)
 
+api = Blueprint("api", __name__)
 
-@app.route("/auth/register", methods=["POST"])
+
+@api.route("/auth/register", methods=["POST"])
 def new_user():
     """
     Creates a new user.
@@ -18,17 +34,20 @@ def new_user():
     except ValidationError as e:
         return jsonify({"Message": str(e)}), 400
 
-    # check for duplicates before creating the new user
-    duplicate = User.query.filter_by(username=user.username).first()
-    if not duplicate:
-        user.set_password(user.password_hash)
-        db.session.add(user)
-        db.session.commit()
-        return jsonify({"Message": user.username.title() + " has been created"}), 201
-    return jsonify({"Message": "A user with that name already exists. Please try again"}), 400
+    # the unique username index rejects duplicates
+    user.set_password(user.password_hash)
+    db.session.add(user)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"Message": "A user with that name already exists. Please try again"}), 400
+    response = jsonify({"Message": user.username.title() + " has been created"})
+    db.session.commit()
+    return response, 201
 
 
-@app.route("/auth/login", methods=["POST"])
+@api.route("/auth/login", methods=["POST"])
 def login():
     """
     Login a pre-existing user and return a token.
@@ -46,8 +65,21 @@ def login():
     return jsonify({"Message": "Invalid username or password. Please try again"}), 401
 
 
-@app.route("/bucketlists/", methods=["POST"])
+@api.route("/metrics", methods=["GET"])
+def show_metrics():
+    """
+    Returns the request metrics of every worker process for Prometheus.
+    """
+    if not current_app.config.get("METRICS"):
+        return jsonify({"Message": "Your request was not found. Please try again"}), 404
+    metrics = get_metrics()
+    count_caches(metrics)
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@api.route("/bucketlists/", methods=["POST"])
 @auth_token.login_required
+@invalidates_cache
 def new_bucketlist():
     """
     Creates a new bucketlist.
@@ -61,30 +93,40 @@ def new_bucketlist():
     except ValidationError as e:
         return jsonify({"Message": str(e)}), 400
 
-    # checks for duplicates before creating the new bucketlist
-    duplicate = Bucketlist.query.filter_by(name=bucketlist.name,
-                                           created_by=g.user.id).first()
-    if not duplicate:
-        bucketlist.created_by = g.user.id
-        db.session.add(bucketlist)
-        db.session.commit()
-        return jsonify({"Message": bucketlist.name.title() + " has been created"}), 201
-    return jsonify({"Message": "A bucketlist with that name already exists. Please try again"}), 400
+    # the unique (created_by, name) index rejects duplicates
+    bucketlist.created_by = g.user.id
+    db.session.add(bucketlist)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"Message": "A bucketlist with that name already exists. Please try again"}), 400
+    response = jsonify({"Message": bucketlist.name.title() + " has been created"})
+    db.session.commit()
+    return response, 201
 
 
-@app.route("/bucketlists/", methods=["GET"])
+@api.route("/bucketlists/", methods=["GET"])
 @auth_token.login_required
+@cached
 def all_bucketlists():
     """
     Returns all the bucketlists.
 
-    'q' defines a specific item to be searched for
-    'page' defines the number of pages
+    'q' defines the words to search for in bucketlist and item names
+    'cursor' defines the position to continue from, as given in next/prev
+    'page' defines the number of pages (kept for older clients)
     'limit' defines the number of results per page
+    'fields' defines the comma separated fields to return, e.g. id,name
+    'embed' defines whether to return the items, their count or none
+    'include_archived' defines whether to return archived items too
     """
     q = request.args.get("q", "")
+    cursor = request.args.get("cursor")
+    page = request.args.get("page")
     try:
-        page = int(request.args.get("page", 1))
+        if page is not None:
+            page = int(page)
     except:
         return jsonify({"Message": "Please use numbers to define the page"}), 400
     try:
@@ -93,82 +135,447 @@ def all_bucketlists():
             limit = 100
     except:
         return jsonify({"Message": "Please use numbers to define the limit"}), 400
+    try:
+        fields = Bucketlist.select_fields(request.args.get("fields"), request.args.get("embed"))
+    except ValidationError as e:
+        return jsonify({"Message": str(e)}), 400
+
+    # answers polling clients from a single aggregate query when nothing changed;
+    # the items are only read when they are returned or searched
+    state = collection_state(g.user.id, items="items" in fields or bool(q))
+    response = not_modified(state)
+    if response:
+        return response
 
-    bucketlists = Bucketlist.query.filter(Bucketlist.created_by == g.user.id,
-                                          Bucketlist.name.ilike("%" + q + "%")).paginate(page, limit, error_out=True)
-    if len(bucketlists.items) == 0:
+    key, direction = None, "next"
+    if cursor is not None:
+        try:
+            created_by, key, direction = decode_cursor(cursor)
+        except ValidationError:
+            created_by = None
+        if created_by != g.user.id or not isinstance(key, int):
+            return jsonify({"Message": "The cursor is invalid. Please try again"}), 400
+
+    # only the columns of the requested fields are loaded
+    query = Bucketlist.load_fields(Bucketlist.query, fields)
+    if q:
+        # search results are ranked, so their cursors hold a position in the ranking
+        if page is not None and cursor is None:
+            key = max(page - 1, 0) * limit
+        ids, next_key, prev_key = ranked_page(
+            lambda offset, count: search_bucketlists(g.user.id, q, offset, count),
+            limit, key, direction)
+        found = dict((bucketlist.id, bucketlist) for bucketlist in
+                     query.filter(Bucketlist.id.in_(ids))) if ids else {}
+        results = [found[bucketlist_id] for bucketlist_id in ids]
+    elif page is not None and cursor is None:
+        # offset pagination for clients that still send 'page'
+        bucketlists = query.filter_by(created_by=g.user.id).order_by(
+            Bucketlist.id).paginate(page, limit, error_out=True)
+        results = bucketlists.items
+        next_key = results[-1].id if bucketlists.has_next else None
+        prev_key = results[0].id if bucketlists.has_prev else None
+    else:
+        results, next_key, prev_key = keyset_page(
+            query.filter_by(created_by=g.user.id), Bucketlist.id,
+            limit, key, direction)
+
+    if len(results) == 0:
         return jsonify({"Message": "Your request was not found. Please try again"}), 404
     else:
-        if bucketlists.has_next:
-            next_page = "/bucketlists/?" + "limit=" + str(limit) + "&page=" + str(page + 1)
+        # the links keep the search and the shape of the results
+        args = {"q": q or None, "limit": limit, "fields": request.args.get("fields"),
+                "embed": request.args.get("embed"),
+                "include_archived": request.args.get("include_archived")}
+        if next_key is not None:
+            next_page = url_for("api.all_bucketlists",
+                                cursor=encode_cursor(g.user.id, next_key, "next"), **args)
         else:
             next_page = "None"
-        if bucketlists.has_prev:
-            prev_page = "/bucketlists/?" + "limit=" + str(limit) + "&page=" + str(page - 1)
+        if prev_key is not None:
+            prev_page = url_for("api.all_bucketlists",
+                                cursor=encode_cursor(g.user.id, prev_key, "prev"), **args)
         else:
             prev_page = "None"
 
-        return jsonify({"count": len(bucketlists.items),
-                        "next": next_page,
-                        "prev": prev_page,
-                        "Bucketlists": [bucketlist.export_data() for bucketlist in bucketlists.items]}), 200
+        return add_validators(jsonify({"count": len(results),
+                                       "next": next_page,
+                                       "prev": prev_page,
+                                       "Bucketlists": Bucketlist.export_many(
+                                           results, fields, include_archived())}),
+                              state), 200
+
+
+@api.route("/bucketlists/stats", methods=["GET"])
+@auth_token.login_required
+@cached
+def bucketlist_stats():
+    """
+    Returns the number of items and done items of every bucketlist
+    and of all of them, from the counters on the bucketlists alone.
+    """
+    rows = db.session.query(Bucketlist.id, Bucketlist.name, Bucketlist.item_count,
+                            Bucketlist.done_count).filter(
+        Bucketlist.created_by == g.user.id).order_by(Bucketlist.id).all()
+    return jsonify({"Bucketlists": [{"id": id, "name": name.title(), "item_count": item_count,
+                                     "done_count": done_count}
+                                    for id, name, item_count, done_count in rows],
+                     "total": {"bucketlists": len(rows),
+                               "items": sum(row.item_count for row in rows),
+                               "done": sum(row.done_count for row in rows)}}), 200
+
+
+@api.route("/bucketlists/changes", methods=["GET"])
+@auth_token.login_required
+@cached
+def bucketlist_changes():
+    """
+    Returns the bucketlists and items created or modified since a sync
+    token, the ids of those deleted since, and a new sync token.
+
+    'since' defines the sync token of the last sync, all the data is
+    returned without it
+    'limit' defines the number of bucketlists and of items per response
+    """
+    try:
+        limit = min(int(request.args.get("limit", 100)), 500)
+    except ValueError:
+        return jsonify({"Message": "Please use numbers to define the limit"}), 400
+    try:
+        data = changes(g.user.id, request.args.get("since"), limit)
+    except ValidationError:
+        return jsonify({"Message": "The sync token is invalid. Please sync without it"}), 400
+    return jsonify(data), 200
+
+
+@api.route("/bucketlists/export", methods=["GET"])
+@auth_token.login_required
+def export_bucketlists():
+    """
+    Streams all the bucketlists as newline-delimited JSON.
+
+    Rows are read from the cursor in chunks, so memory stays
+    constant however many bucketlists there are. Names are exported
+    as they are stored, so an export can be imported back as it was.
+    """
+    chunk_size = current_app.config.get("STREAM_CHUNK_SIZE", 500)
+    archived = include_archived()
+    query = Bucketlist.query.filter_by(created_by=g.user.id).order_by(
+        Bucketlist.id).yield_per(chunk_size)
+
+    def generate():
+        chunk = []
+        for bucketlist in query:
+            chunk.append(bucketlist)
+            if len(chunk) == chunk_size:
+                for data in Bucketlist.export_many(chunk, include_archived=archived,
+                                                   titled=False):
+                    yield dumps(data) + "\n"
+                chunk = []
+        for data in Bucketlist.export_many(chunk, include_archived=archived, titled=False):
+            yield dumps(data) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+def _exported_date(data):
+    """Returns the creation date of exported data, or the current date"""
+    try:
+        return parse_http_date(data.get("date_created")) or datetime.now()
+    except AttributeError:
+        # not a string
+        return datetime.now()
 
 
-@app.route("/bucketlists/<int:bucket_id>", methods=["GET"])
+@api.route("/bucketlists/import", methods=["POST"])
 @auth_token.login_required
+@invalidates_cache
+def import_bucketlists():
+    """
+    Creates bucketlists and their items from newline-delimited JSON,
+    in the format returned by the export.
+
+    The body is read line by line and saved in chunked transactions.
+    The creation dates of the export are kept; the modification dates
+    are those of the import, so sync clients get the imported rows.
+    """
+    chunk_size = current_app.config.get("STREAM_CHUNK_SIZE", 500)
+    user_id = g.user.id
+    errors, chunk, count = [], [], 0
+
+    def insert(new):
+        db.session.add_all([bucketlist for _, bucketlist, _ in new])
+        db.session.flush()
+        db.session.bulk_insert_mappings(BucketlistItem, [
+            {"name": item.name, "done": item.done, "bucket": bucketlist.id,
+             "created_by": user_id, "date_created": item.date_created}
+            for _, bucketlist, items in new for item in items])
+        db.session.commit()
+        for _, bucketlist, _ in new:
+            db.session.expunge(bucketlist)
+
+    def save(chunk):
+        # checks for duplicates of the whole chunk in one query
+        existing = Bucketlist.existing_names(user_id, [bucketlist.name for _, bucketlist, _ in chunk])
+        new = []
+        for line, bucketlist, items in chunk:
+            if bucketlist.name in existing:
+                errors.append({"line": line, "Message": "A bucketlist with that name already exists"})
+            else:
+                existing.add(bucketlist.name)
+                bucketlist.created_by = user_id
+                new.append((line, bucketlist, items))
+        try:
+            insert(new)
+            return len(new)
+        except IntegrityError:
+            db.session.rollback()
+        # another request created one of the names since the check above,
+        # so the lines are saved one at a time to find out which
+        saved = 0
+        for line, bucketlist, items in new:
+            # the id given by the failed flush was rolled back
+            bucketlist.id = None
+            try:
+                insert([(line, bucketlist, items)])
+                saved += 1
+            except IntegrityError:
+                db.session.rollback()
+                errors.append({"line": line, "Message": "A bucketlist with that name already exists"})
+        return saved
+
+    for line, raw in enumerate(request.stream, 1):
+        if not raw.strip():
+            continue
+        try:
+            data = json.loads(raw)
+            bucketlist = Bucketlist()
+            if not isinstance(data, dict) or bucketlist.import_data(data) == "Invalid":
+                errors.append({"line": line, "Message": "The bucketlist must have a name"})
+                continue
+            bucketlist.date_created = _exported_date(data)
+            items, names = [], set()
+            for index, item_data in enumerate(data.get("items", [])):
+                item = BucketlistItem()
+                try:
+                    if item.import_data(item_data) == "Invalid":
+                        message = "The item must have a name"
+                    elif item.name in names:
+                        message = "The item is already in the bucketlist"
+                    else:
+                        names.add(item.name)
+                        item.date_created = _exported_date(item_data)
+                        items.append(item)
+                        continue
+                except ValidationError as e:
+                    message = str(e)
+                except (TypeError, AttributeError):
+                    message = "The item is not valid"
+                errors.append({"line": line, "item": index, "Message": message})
+        except ValidationError as e:
+            errors.append({"line": line, "Message": str(e)})
+            continue
+        except (ValueError, TypeError, AttributeError):
+            errors.append({"line": line, "Message": "The line is not a valid bucketlist"})
+            continue
+        chunk.append((line, bucketlist, items))
+        if len(chunk) == chunk_size:
+            count += save(chunk)
+            chunk = []
+    if chunk:
+        count += save(chunk)
+    return jsonify({"count": count, "Errors": errors}), 201 if count else 400
+
+
+@api.route("/bucketlists/<int:bucket_id>", methods=["GET"])
+@auth_token.login_required
+@cached
 def get_bucketlist(bucket_id):
     """
     Returns a specified bucketlist.
+
+    'limit' defines the number of items to return, with a link to the
+    next page of items, instead of all of them
+    'include_archived' defines whether to return archived items too
     """
+    limit = request.args.get("limit")
+    try:
+        if limit is not None:
+            limit = min(int(limit), 100)
+    except ValueError:
+        return jsonify({"Message": "Please use numbers to define the limit"}), 400
+
     # ensures that a logged-in user can only edit their own bucketlist
-    bucketlist = Bucketlist.query.filter_by(id=bucket_id,
-                                            created_by=g.user.id).first()
-    if not bucketlist:
+    state = bucketlist_state(bucket_id, g.user.id)
+    if not state:
         return jsonify({"Message": "The bucketlist was not found. Please try again"}), 404
-    return jsonify({"Bucketlist": bucketlist.export_data()}), 200
+    response = not_modified(state)
+    if response:
+        return response
+    bucketlist = Bucketlist.query.get(bucket_id)
+    if limit is None:
+        return add_validators(jsonify({"Bucketlist": Bucketlist.export_many(
+            [bucketlist], include_archived=include_archived())[0]}), state), 200
+
+    Item = BucketlistItem.source(include_archived())
+    items, next_key, _ = sorted_page(db.session.query(Item).filter(Item.bucket == bucket_id),
+                                     Item.id, Item.id, limit)
+    if next_key is not None:
+        next_items = url_for("api.all_items", bucket_id=bucket_id, limit=limit,
+                             include_archived=request.args.get("include_archived"),
+                             cursor=encode_cursor(g.user.id, next_key, "next"))
+    else:
+        next_items = "None"
+    return add_validators(jsonify({"Bucketlist": bucketlist.export_data(items),
+                                   "next_items": next_items}), state), 200
 
 
-@app.route("/bucketlists/<int:bucket_id>", methods=["PUT"])
+@api.route("/bucketlists/<int:bucket_id>", methods=["PUT"])
 @auth_token.login_required
+@invalidates_cache
 def update_bucketlist(bucket_id):
     """
     Updates a specified bucketlist.
+
+    An If-Match header makes the update conditional on the bucketlist
+    not having changed since the client last got it.
     """
     # ensures that a logged-in user can only edit their own bucketlist
     bucketlist = Bucketlist.query.filter_by(id=bucket_id,
                                             created_by=g.user.id).first()
     if not bucketlist:
         return jsonify({"Message": "The bucketlist was not found. Please try again"}), 404
+    failed = precondition_failed(bucket_id, g.user.id)
+    if failed:
+        return failed
     else:
-        # checks for duplicates before updating the bucketlist
-        duplicate = Bucketlist.query.filter_by(name=request.json["name"],
-                                               created_by=g.user.id).first()
-        if not duplicate:
-            bucketlist.update_data(request.json)
-            db.session.commit()
-            return jsonify({"Message": "Updated to " + bucketlist.name.title()}), 200
-        else:
+        # the unique (created_by, name) index rejects duplicates of other bucketlists
+        if request.json.get("name") == bucketlist.name:
             return jsonify({"Message": "A bucketlist with that name already exists. Please try again"}), 400
+        bucketlist.update_data(request.json)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({"Message": "A bucketlist with that name already exists. Please try again"}), 400
+        response = jsonify({"Message": "Updated to " + bucketlist.name.title()})
+        db.session.commit()
+        return response, 200
 
 
-@app.route("/bucketlists/<int:bucket_id>", methods=["DELETE"])
+@api.route("/bucketlists/<int:bucket_id>", methods=["DELETE"])
 @auth_token.login_required
+@invalidates_cache
 def delete_bucketlist(bucket_id):
     """
     Deletes a specified bucketlist.
+
+    An If-Match header makes the delete conditional on the bucketlist
+    not having changed since the client last got it.
     """
     # ensures that a logged-in user can only edit their own bucketlist
     bucketlist = Bucketlist.query.filter_by(id=bucket_id,
                                             created_by=g.user.id).first()
     if not bucketlist:
         return jsonify({"Message": "The bucketlist was not found. Please try again"}), 404
+    failed = precondition_failed(bucket_id, g.user.id)
+    if failed:
+        return failed
     db.session.delete(bucketlist)
+    record_deletion(g.user.id, "bucketlist", bucketlist.id)
     db.session.commit()
     return jsonify({"Message": bucketlist.name.title() + " has been deleted"}), 200
 
 
-@app.route("/bucketlists/<int:bucket_id>/items/", methods=["POST"])
+@api.route("/bucketlists/<int:bucket_id>/items/", methods=["GET"])
 @auth_token.login_required
+@cached
+def all_items(bucket_id):
+    """
+    Returns the items of a specified bucketlist, a page at a time.
+
+    'done' defines whether to return only done (true) or pending (false) items
+    'created_after', 'created_before', 'modified_after' and 'modified_before'
+    define ranges of dates, e.g. 2016-11-06 or 2016-11-06T08:49:37
+    'sort' defines the field to sort by, with a leading - for descending order
+    'cursor' defines the position to continue from, as given in next/prev
+    'limit' defines the number of results per page
+    'include_archived' defines whether to return archived items too
+    """
+    try:
+        limit = min(int(request.args.get("limit", 20)), 100)
+    except ValueError:
+        return jsonify({"Message": "Please use numbers to define the limit"}), 400
+    sort = request.args.get("sort", "id")
+    if sort.lstrip("-") not in BucketlistItem.SORTS:
+        return jsonify({"Message": "Please sort by one of " + ", ".join(BucketlistItem.SORTS)}), 400
+    Item = BucketlistItem.source(include_archived())
+    column = getattr(Item, sort.lstrip("-"))
+
+    query = db.session.query(Item).filter(Item.bucket == bucket_id)
+    done = request.args.get("done")
+    if done is not None:
+        if done.lower() not in ("true", "false", "yes", "no"):
+            return jsonify({"Message": "Please use true or false to define done"}), 400
+        query = query.filter(Item.done == (done.lower() in ("true", "yes")))
+    for arg, attribute, compare in (("created_after", Item.date_created, operator.gt),
+                                    ("created_before", Item.date_created, operator.lt),
+                                    ("modified_after", Item.date_modified, operator.gt),
+                                    ("modified_before", Item.date_modified, operator.lt)):
+        if arg in request.args:
+            try:
+                query = query.filter(compare(attribute, parse_date(request.args[arg])))
+            except ValueError:
+                return jsonify({"Message": "Please use dates like 2016-11-06 to define " + arg}), 400
+
+    key, direction = None, "next"
+    cursor = request.args.get("cursor")
+    if cursor is not None:
+        try:
+            created_by, key, direction = decode_cursor(cursor)
+            if column.key.startswith("date_"):
+                key = [parse_date(key[0]), key[1]]
+            elif not isinstance(key[0], int if column.key == "id" else type(u"")):
+                # a value of another type would fail in the database driver
+                raise ValueError(cursor)
+            valid = created_by == g.user.id and len(key) == 2 and isinstance(key[1], int)
+        except (ValidationError, ValueError, TypeError, IndexError, KeyError):
+            valid = False
+        if not valid:
+            return jsonify({"Message": "The cursor is invalid. Please try again"}), 400
+
+    state = bucketlist_state(bucket_id, g.user.id)
+    if not state:
+        return jsonify({"Message": "The bucketlist was not found. Please try again"}), 404
+    response = not_modified(state)
+    if response:
+        return response
+
+    items, next_key, prev_key = sorted_page(query, column, Item.id, limit, key,
+                                            direction, descending=sort.startswith("-"))
+
+    # the links keep the filters and the order of the results
+    args = dict((arg, request.args[arg]) for arg in request.args if arg != "cursor")
+    args["limit"] = limit
+
+    def link(position, direction):
+        if position is None:
+            return "None"
+        if isinstance(position[0], datetime):
+            position = [position[0].isoformat(), position[1]]
+        return url_for("api.all_items", bucket_id=bucket_id,
+                       cursor=encode_cursor(g.user.id, position, direction), **args)
+
+    return add_validators(jsonify({"count": len(items),
+                                   "next": link(next_key, "next"),
+                                   "prev": link(prev_key, "prev"),
+                                   "Items": [item.export_summary() for item in items]}),
+                          state), 200
+
+
+@api.route("/bucketlists/<int:bucket_id>/items/", methods=["POST"])
+@auth_token.login_required
+@invalidates_cache
 def new_item(bucket_id):
     """
     Creates a new bucketlist item.
@@ -187,20 +594,89 @@ def new_item(bucket_id):
         except ValidationError as e:
             return jsonify({"Message": str(e)}), 400
 
-        # check for duplicates before creating the new item
-        duplicate = BucketlistItem.query.filter_by(name=item.name, bucket=bucket_id).first()
-        if not duplicate:
-            item.bucket = bucket_id
-            item.created_by = g.user.id
-            db.session.add(item)
+        # the unique (bucket, name) index rejects duplicates
+        item.bucket = bucket_id
+        item.created_by = g.user.id
+        db.session.add(item)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({"Message": "A bucketlist item with that name already exists. Please try again"}), 400
+        response = jsonify({"Message": item.name.title() + " has been created",
+                            "View it here": item.export_data()})
+        db.session.commit()
+        return response, 201
+
+
+@api.route("/bucketlists/<int:bucket_id>/items/bulk", methods=["POST"])
+@auth_token.login_required
+@invalidates_cache
+def new_items(bucket_id):
+    """
+    Creates several bucketlist items from a list in one transaction.
+
+    Returns a result for every item in the order they were sent.
+    """
+    bucketlist = Bucketlist.query.filter_by(id=bucket_id,
+                                            created_by=g.user.id).first()
+    if not bucketlist:
+        return jsonify({"Message": "The bucketlist was not found. Please try again"}), 404
+    if not isinstance(request.json, list) or len(request.json) == 0:
+        return jsonify({"Message": "Please send a list of items"}), 400
+    if len(request.json) > current_app.config.get("MAX_BULK_ITEMS", 1000):
+        return jsonify({"Message": "Please send at most " +
+                        str(current_app.config.get("MAX_BULK_ITEMS", 1000)) + " items at a time"}), 400
+
+    # validates every item, the same way a single item is validated
+    results, items = [], []
+    for data in request.json:
+        item = BucketlistItem()
+        try:
+            sanitized = item.import_data(data) if isinstance(data, dict) else "Invalid"
+        except ValidationError as e:
+            results.append({"Message": str(e), "status": 400})
+            continue
+        except AttributeError:
+            sanitized = "Invalid"
+        if sanitized == "Invalid":
+            results.append({"Message": "The item must have a name", "status": 400})
+            continue
+        results.append({"name": item.name})
+        items.append((len(results) - 1, item))
+
+    # checks for duplicates within the batch and against the bucketlist in one query
+    existing = BucketlistItem.existing_names(bucket_id, [item.name for _, item in items])
+    new = []
+    for index, item in items:
+        if item.name in existing:
+            results[index] = {"Message": "A bucketlist item with that name already exists. Please try again",
+                              "status": 400}
+        else:
+            existing.add(item.name)
+            new.append((index, item))
+
+    if new:
+        db.session.bulk_insert_mappings(BucketlistItem, [
+            {"name": item.name, "done": item.done, "bucket": bucket_id,
+             "created_by": g.user.id} for _, item in new])
+        try:
             db.session.commit()
-            return jsonify({"Message": item.name.title() + " has been created",
-                            "View it here": item.export_data()}), 201
-        return jsonify({"Message": "A bucketlist item with that name already exists. Please try again"}), 400
+        except IntegrityError:
+            # another request created one of the names since the check above
+            db.session.rollback()
+            return jsonify({"Message": "Some of the items were created by another request. Please try again"}), 400
+        ids = BucketlistItem.ids_by_name(bucket_id, [item.name for _, item in new])
+        for index, item in new:
+            item.id = ids[item.name]
+            results[index] = {"Message": item.name.title() + " has been created",
+                              "View it here": item.export_data(), "status": 201}
+    return jsonify({"count": len(new), "Results": results}), 201 if new else 400
 
 
-@app.route("/bucketlists/<int:bucket_id>/items/<int:item_id>", methods=["PUT"])
+@api.route("/bucketlists/<int:bucket_id>/items/<int:item_id>", methods=["PUT"])
 @auth_token.login_required
+@invalidates_cache
 def update_item(bucket_id, item_id):
     """
     Updates a specified item belonging to a specified bucketlist
@@ -211,12 +687,20 @@ def update_item(bucket_id, item_id):
     if not item:
         return jsonify({"Message": "The item was not found. Please try again"}), 404
     item.update_data(request.json)
+    # the unique (bucket, name) index rejects the names of the other items
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"Message": "A bucketlist item with that name already exists. Please try again"}), 400
+    response = jsonify({"Message": "Updated: " + item.name.title(),
+                        "View it here": item.export_data()})
     db.session.commit()
-    return jsonify({"Message": "Updated: " + item.name.title(),
-                    "View it here": item.export_data()}), 200
+    return response, 200
 
-@app.route("/bucketlists/<int:bucket_id>/items/<int:item_id>", methods=["DELETE"])
+@api.route("/bucketlists/<int:bucket_id>/items/<int:item_id>", methods=["DELETE"])
 @auth_token.login_required
+@invalidates_cache
 def delete_item(bucket_id, item_id):
     """
     Deletes a specified item belonging to a specified bucketlist
@@ -227,6 +711,23 @@ def delete_item(bucket_id, item_id):
     if not item:
         return jsonify({"Message": "The item was not found. Please try again"}), 404
     db.session.delete(item)
+    record_deletion(g.user.id, "item", item.id)
     db.session.commit()
     return jsonify({"Message": item.name.title() + " has been deleted",
                     "View the remaining items here": item.export_data()}), 200
+
+
+@api.route("/bucketlists/<int:bucket_id>/items/restore", methods=["POST"])
+@auth_token.login_required
+@invalidates_cache
+def restore_archived_items(bucket_id):
+    """
+    Moves the archived items of a specified bucketlist back with the others
+    """
+    # ensures that a logged-in user can only access their own bucketlist
+    bucketlist = Bucketlist.query.filter_by(id=bucket_id, created_by=g.user.id).first()
+    if not bucketlist:
+        return jsonify({"Message": "The bucketlist was not found. Please try again"}), 404
+    restored, conflicts = restore_items(bucket_id)
+    return jsonify({"Message": "%d items have been restored" % restored,
+                    "conflicts": conflicts}), 200
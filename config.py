@@ -9,6 +9,50 @@ class Config(object):
     SQLALCHEMY_TRACK_MODIFICATIONS = True
     SECRET_KEY = os.environ['SECRET_KEY']
     SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(basedir, "bucketlist.sqlite")
+    SQLALCHEMY_POOL_SIZE = 5
+    SQLALCHEMY_MAX_OVERFLOW = 10
+    SQLALCHEMY_POOL_TIMEOUT = 10
+    # a QueuePool of SQLite connections shared by threads, False leaves
+    # the pool to SQLAlchemy
+    SQLITE_QUEUE_POOL = True
+    # applied in order to every new SQLite connection
+    SQLITE_PRAGMAS = (
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("busy_timeout", 5000),
+        ("cache_size", -20000),
+        ("mmap_size", 268435456),
+        ("foreign_keys", "ON"),
+    )
+    TOKEN_CACHE_SIZE = 10000
+    TOKEN_CACHE_TTL = 300
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256"
+    PASSWORD_HASH_ITERATIONS = 50000
+    PASSWORD_HASH_POOL_SIZE = 2
+    MAX_BULK_ITEMS = 1000
+    STREAM_CHUNK_SIZE = 500
+    # "sqlite" is shared by the worker processes of 'manage.py serve' and by
+    # the other manage.py commands, "memory" only works with a single process
+    RESPONSE_CACHE = "sqlite"
+    RESPONSE_CACHE_SIZE = 1000
+    RESPONSE_CACHE_TTL = 300
+    RESPONSE_CACHE_PATH = os.path.join(basedir, "response_cache.sqlite")
+    # /metrics isn't authenticated, so it's only exposed when turned on
+    METRICS = False
+    # shared by the worker processes, None keeps the metrics in each process
+    METRICS_PATH = os.path.join(basedir, "metrics.sqlite")
+    QUERY_COUNT_HEADER = False
+    # seconds, None turns the slow-query log off
+    SLOW_QUERY_THRESHOLD = None
+    SLOW_QUERY_LOG_PATH = os.path.join(basedir, "slow_queries.sqlite")
+    JSONIFY_PRETTYPRINT_REGULAR = False
+    # "json" or "ujson", None picks the fastest one installed
+    JSON_BACKEND = None
+    # responses smaller than COMPRESS_MIN_SIZE bytes aren't compressed
+    COMPRESSION = True
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 5
 
 
 class TestingConfig(object):
@@ -18,3 +62,40 @@ class TestingConfig(object):
     SQLALCHEMY_TRACK_MODIFICATIONS = True
     SECRET_KEY = os.environ['SECRET_KEY']
     SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(basedir, "test.sqlite")
+    SQLALCHEMY_POOL_SIZE = 5
+    SQLALCHEMY_MAX_OVERFLOW = 10
+    SQLALCHEMY_POOL_TIMEOUT = 10
+    # a QueuePool of SQLite connections shared by threads, False leaves
+    # the pool to SQLAlchemy
+    SQLITE_QUEUE_POOL = True
+    # applied in order to every new SQLite connection
+    SQLITE_PRAGMAS = (
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("busy_timeout", 5000),
+        ("cache_size", -20000),
+        ("mmap_size", 268435456),
+        ("foreign_keys", "ON"),
+    )
+    TOKEN_CACHE_SIZE = 100
+    TOKEN_CACHE_TTL = 300
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256"
+    PASSWORD_HASH_ITERATIONS = 1000
+    PASSWORD_HASH_POOL_SIZE = 0
+    MAX_BULK_ITEMS = 1000
+    STREAM_CHUNK_SIZE = 500
+    RESPONSE_CACHE = None
+    RESPONSE_CACHE_SIZE = 100
+    RESPONSE_CACHE_TTL = 300
+    RESPONSE_CACHE_PATH = os.path.join(basedir, "test_response_cache.sqlite")
+    METRICS = True
+    METRICS_PATH = None
+    QUERY_COUNT_HEADER = True
+    SLOW_QUERY_THRESHOLD = 0.1
+    SLOW_QUERY_LOG_PATH = None
+    JSONIFY_PRETTYPRINT_REGULAR = True
+    JSON_BACKEND = None
+    COMPRESSION = True
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_LEVEL = 6
+    COMPRESS_BROTLI_QUALITY = 5
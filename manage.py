@@ -1,15 +1,114 @@
-from flask_migrate import Migrate, MigrateCommand
+import multiprocessing
+import sys
 from flask_script import Manager
-from bucketlist import app, db, views
+from bucketlist import create_app, db, search, counters, archive as archiving
+from bucketlist.models import ArchivedItem
+from bucketlist.slow_queries import get_query_log
 
 '''
 Creates scripts that allow
 db creation and migrations to run
 from the shell using manage.py commands.
+
+Alembic takes about as long to import as the whole app, so the db
+commands are only added when one of them is run.
 '''
+app = create_app()
 manager = Manager(app)
-migrate = Migrate(app, db)
-manager.add_command('db', MigrateCommand)
+
+
+def add_migrate_command():
+    """Adds the 'db' commands of Flask-Migrate"""
+    from flask_migrate import Migrate, MigrateCommand
+    Migrate(app, db)
+    manager.add_command('db', MigrateCommand)
+
+
+@manager.command
+def rebuild_search_index():
+    """Rebuilds the full-text search index of bucketlists and items"""
+    search.rebuild_index()
+
+
+@manager.command
+def recompute_item_counts():
+    """Recomputes the item and done counts of every bucketlist"""
+    counters.recompute_counts()
+
+
+@manager.option("-d", "--days", dest="days", type=int, default=90,
+                help="archive done items not modified for this many days")
+@manager.option("-c", "--chunk-size", dest="chunk_size", type=int, default=500,
+                help="items moved per transaction")
+def archive(days, chunk_size):
+    """Moves old done items into the archive table, while the app keeps running"""
+    print("%d items archived" % archiving.archive_items(days, chunk_size))
+
+
+@manager.option("-b", "--bucketlist", dest="bucket_id", type=int, default=None,
+                help="the bucketlist to restore, all of them by default")
+def restore(bucket_id):
+    """Moves archived items back into the items table"""
+    if bucket_id is None:
+        bucket_ids = [bucket for bucket, in db.session.query(ArchivedItem.bucket).distinct()]
+    else:
+        bucket_ids = [bucket_id]
+    for bucket_id in bucket_ids:
+        restored, conflicts = archiving.restore_items(bucket_id)
+        print("bucketlist %d: %d items restored, %d left archived by name conflicts"
+              % (bucket_id, restored, conflicts))
+
+
+@manager.option("-n", "--top", dest="top", type=int, default=20,
+                help="number of statements to show")
+@manager.option("-r", "--recent", dest="recent", type=int, default=10,
+                help="number of the latest slow statements to show")
+def slow_queries(top, recent):
+    """Shows the statements with the most total time and the latest slow ones"""
+    query_log = get_query_log()
+    if query_log is None:
+        print("The slow-query log is off, set SLOW_QUERY_THRESHOLD to turn it on")
+        return
+    print("%10s %8s %10s %10s %6s  %s" % ("total(s)", "count", "mean(ms)", "max(ms)",
+                                         "slow", "statement"))
+    for statement, count, total, longest, slow in query_log.top(top):
+        print("%10.3f %8d %10.2f %10.2f %6d  %s" % (total, count, 1000 * total / count,
+                                                   1000 * longest, slow, statement))
+    if recent:
+        print("")
+        print("%10s %-20s %8s  %s" % ("ms", "view", "user", "statement / parameters"))
+        for statement, parameters, seconds, view, user_id in query_log.recent(recent):
+            print("%10.1f %-20s %8s  %s %s" % (1000 * seconds, view, user_id,
+                                              statement, parameters))
+
+
+@manager.option("-b", "--bind", dest="bind", default="127.0.0.1:5000")
+@manager.option("-w", "--workers", dest="workers", type=int,
+                default=multiprocessing.cpu_count() * 2 + 1)
+@manager.option("-t", "--threads", dest="threads", type=int, default=1,
+                help="threads per worker")
+@manager.option("--max-requests", dest="max_requests", type=int, default=1000,
+                help="requests after which a worker is replaced, 0 to never replace it")
+@manager.option("--graceful-timeout", dest="graceful_timeout", type=int, default=30,
+                help="seconds workers get to finish their requests on shutdown")
+def serve(bind, workers, threads, max_requests, graceful_timeout):
+    """Serves the app with a pre-forking multi-process server"""
+    if workers > 1 and app.config.get("RESPONSE_CACHE") == "memory":
+        print("The memory response cache isn't shared by worker processes, "
+              "set RESPONSE_CACHE to \"sqlite\" or serve with --workers 1")
+        return
+    if workers > 1 and app.config.get("METRICS") and not app.config.get("METRICS_PATH"):
+        print("Metrics kept in each process would go backwards between scrapes, "
+              "set METRICS_PATH or serve with --workers 1")
+        return
+    from bucketlist.server import Server
+    Server(app, {"bind": bind, "workers": workers, "threads": threads,
+                 "max_requests": max_requests,
+                 # staggers the restarts so workers aren't all replaced at once
+                 "max_requests_jitter": max_requests // 10,
+                 "graceful_timeout": graceful_timeout}).run()
 
 if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] in ("db", "-?", "--help"):
+        add_migrate_command()
     manager.run()
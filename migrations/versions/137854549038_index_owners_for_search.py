@@ -0,0 +1,52 @@
+"""index owners for search
+
+Revision ID: 137854549038
+Revises: 0fe5faf02597
+Create Date: 2026-10-18 20:19:40.911869
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '137854549038'
+down_revision = '0fe5faf02597'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (('bucketlist', 'bucketlist_fts'), ('bucketlist_item', 'bucketlist_item_fts'))
+
+
+def create_indexes(columns):
+    """Recreates the search indexes and their triggers over 'columns'"""
+    for table, index in INDEXES:
+        values = {'table': table, 'index': index, 'columns': ', '.join(columns),
+                  'new': ', '.join('new.' + column for column in columns),
+                  'old': ', '.join('old.' + column for column in columns)}
+        for trigger in ('ai', 'ad', 'au'):
+            op.execute("DROP TRIGGER IF EXISTS %s_%s" % (index, trigger))
+        op.execute("DROP TABLE IF EXISTS " + index)
+        op.execute("CREATE VIRTUAL TABLE %(index)s USING fts5("
+                   "%(columns)s, content='%(table)s', content_rowid='id')" % values)
+        op.execute("CREATE TRIGGER %(index)s_ai AFTER INSERT ON %(table)s BEGIN "
+                   "INSERT INTO %(index)s(rowid, %(columns)s) VALUES (new.id, %(new)s); END"
+                   % values)
+        op.execute("CREATE TRIGGER %(index)s_ad AFTER DELETE ON %(table)s BEGIN "
+                   "INSERT INTO %(index)s(%(index)s, rowid, %(columns)s) "
+                   "VALUES ('delete', old.id, %(old)s); END" % values)
+        op.execute("CREATE TRIGGER %(index)s_au AFTER UPDATE OF %(columns)s ON %(table)s BEGIN "
+                   "INSERT INTO %(index)s(%(index)s, rowid, %(columns)s) "
+                   "VALUES ('delete', old.id, %(old)s); "
+                   "INSERT INTO %(index)s(rowid, %(columns)s) VALUES (new.id, %(new)s); END"
+                   % values)
+        op.execute("INSERT INTO %(index)s(%(index)s) VALUES ('rebuild')" % values)
+
+
+def upgrade():
+    # searches match the owner in the index instead of joining bucketlist
+    create_indexes(['name', 'created_by'])
+
+
+def downgrade():
+    create_indexes(['name'])
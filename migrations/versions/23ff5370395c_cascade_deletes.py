@@ -0,0 +1,64 @@
+"""cascade deletes
+
+Revision ID: 23ff5370395c
+Revises: 0a2d9e783392
+Create Date: 2026-10-18 19:49:52.623294
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '23ff5370395c'
+down_revision = '0a2d9e783392'
+branch_labels = None
+depends_on = None
+
+# names the unnamed foreign keys of the initial schema so they can be dropped
+naming_convention = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def rebuild_foreign_keys(ondelete):
+    """
+    Recreates the foreign keys of both tables with the given ON DELETE action.
+
+    SQLite can't alter a constraint, so the tables are copied into new ones.
+    The search and counter triggers would stop the copies being renamed,
+    so they are dropped first and recreated as they were afterwards.
+    """
+    connection = op.get_bind()
+    triggers = connection.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+        "AND tbl_name IN ('bucketlist', 'bucketlist_item')").fetchall()
+    for name, sql in triggers:
+        op.execute("DROP TRIGGER " + name)
+    # the copies would otherwise cascade into each other
+    op.execute("PRAGMA foreign_keys = OFF")
+
+    with op.batch_alter_table('bucketlist', naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('fk_bucketlist_created_by_user', type_='foreignkey')
+        batch_op.create_foreign_key('fk_bucketlist_created_by_user', 'user',
+                                    ['created_by'], ['id'], ondelete=ondelete)
+
+    # the reflected table loses the CHECK constraint of the boolean
+    with op.batch_alter_table('bucketlist_item', naming_convention=naming_convention,
+                              reflect_args=[sa.Column('done', sa.Boolean())]) as batch_op:
+        batch_op.drop_constraint('fk_bucketlist_item_bucket_bucketlist', type_='foreignkey')
+        batch_op.drop_constraint('fk_bucketlist_item_created_by_user', type_='foreignkey')
+        batch_op.create_foreign_key('fk_bucketlist_item_bucket_bucketlist', 'bucketlist',
+                                    ['bucket'], ['id'], ondelete=ondelete)
+        batch_op.create_foreign_key('fk_bucketlist_item_created_by_user', 'user',
+                                    ['created_by'], ['id'], ondelete=ondelete)
+
+    for name, sql in triggers:
+        op.execute(sql)
+    op.execute("PRAGMA foreign_keys = ON")
+
+
+def upgrade():
+    rebuild_foreign_keys('CASCADE')
+
+
+def downgrade():
+    rebuild_foreign_keys(None)
@@ -0,0 +1,47 @@
+"""index bucketlists for paging and add the search index
+
+Revision ID: df5686968739
+Revises: 1f5a1b993b41
+Create Date: 2026-10-18 21:05:12.481630
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'df5686968739'
+down_revision = '1f5a1b993b41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_bucketlist_created_by_id', 'bucketlist', ['created_by', 'id'], unique=False)
+    op.create_index('ix_bucketlist_created_by_date_modified', 'bucketlist', ['created_by', 'date_modified'], unique=False)
+    op.create_index('ix_bucketlist_item_created_by_date_modified', 'bucketlist_item', ['created_by', 'date_modified'], unique=False)
+
+    # full-text search indexes, kept in sync by triggers (see bucketlist/search.py)
+    for table, index in (('bucketlist', 'bucketlist_fts'), ('bucketlist_item', 'bucketlist_item_fts')):
+        values = {'table': table, 'index': index}
+        op.execute("CREATE VIRTUAL TABLE %(index)s USING fts5("
+                   "name, content='%(table)s', content_rowid='id')" % values)
+        op.execute("CREATE TRIGGER %(index)s_ai AFTER INSERT ON %(table)s BEGIN "
+                   "INSERT INTO %(index)s(rowid, name) VALUES (new.id, new.name); END" % values)
+        op.execute("CREATE TRIGGER %(index)s_ad AFTER DELETE ON %(table)s BEGIN "
+                   "INSERT INTO %(index)s(%(index)s, rowid, name) "
+                   "VALUES ('delete', old.id, old.name); END" % values)
+        op.execute("CREATE TRIGGER %(index)s_au AFTER UPDATE OF name ON %(table)s BEGIN "
+                   "INSERT INTO %(index)s(%(index)s, rowid, name) "
+                   "VALUES ('delete', old.id, old.name); "
+                   "INSERT INTO %(index)s(rowid, name) VALUES (new.id, new.name); END" % values)
+        op.execute("INSERT INTO %(index)s(%(index)s) VALUES ('rebuild')" % values)
+
+
+def downgrade():
+    for index in ('bucketlist_fts', 'bucketlist_item_fts'):
+        for trigger in ('ai', 'ad', 'au'):
+            op.execute("DROP TRIGGER IF EXISTS %s_%s" % (index, trigger))
+        op.execute("DROP TABLE IF EXISTS %s" % index)
+    op.drop_index('ix_bucketlist_item_created_by_date_modified', table_name='bucketlist_item')
+    op.drop_index('ix_bucketlist_created_by_date_modified', table_name='bucketlist')
+    op.drop_index('ix_bucketlist_created_by_id', table_name='bucketlist')
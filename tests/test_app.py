@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+import unittest
+from tests.test_base import BaseTestCase
+from bucketlist import create_app
+from config import TestingConfig
+
+
+class TestAppFactory(BaseTestCase):
+    """
+    Test apps are created from their config and import only what they need.
+    """
+    def imports(self, code, modules):
+        """Returns which of 'modules' a fresh interpreter has loaded after running 'code'"""
+        output = subprocess.check_output(
+            [sys.executable, "-c", "%s; import sys; print(sorted(%r.intersection(sys.modules)))"
+             % (code, modules)], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        return output.decode("ascii").strip()
+
+    def test_apps_have_their_own_config(self):
+        """Tests two apps don't share their config."""
+        other = create_app(type("OtherConfig", (TestingConfig,), {"METRICS": False}))
+        self.assertTrue(self.app.config["METRICS"])
+        self.assertFalse(other.config["METRICS"])
+        self.assertEqual(404, other.test_client().get("/metrics").status_code)
+        self.assertEqual(200, self.client.get("/metrics").status_code)
+
+    def test_lazy_imports(self):
+        """Tests the views load with the app, and alembic only for the db commands."""
+        self.assertEqual("[]", self.imports("import bucketlist", {"bucketlist.views"}))
+        self.assertEqual("[]", self.imports("import manage", {"alembic", "flask_migrate"}))
+        self.assertEqual("['alembic']", self.imports(
+            "import manage; manage.add_migrate_command()", {"alembic"}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from datetime import datetime, timedelta
+from flask import json
+from tests.test_base import BaseTestCase
+from bucketlist import db
+from bucketlist.archive import archive_items, restore_items
+from bucketlist.models import Bucketlist, BucketlistItem, ArchivedItem
+
+
+class TestArchive(BaseTestCase):
+    """
+    Test old done items move to the archive and back.
+    """
+    def setUp(self):
+        super(TestArchive, self).setUp()
+        old = datetime.now() - timedelta(days=100)
+        db.session.bulk_insert_mappings(BucketlistItem, [
+            dict(name="old done", bucket=1, created_by=1, done=True, date_modified=old),
+            dict(name="old pending", bucket=1, created_by=1, done=False, date_modified=old),
+            dict(name="new done", bucket=1, created_by=1, done=True)])
+        db.session.commit()
+
+    def get(self, url):
+        response = self.client.get(url, content_type="application/json",
+                                   headers={"Authorization": "Token " + self.token})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+
+    def names(self, items):
+        return sorted(item["name"] for item in items)
+
+    def test_archive_old_done_items(self):
+        """Tests only done items older than the cut-off are moved, in chunks."""
+        self.assertEqual(1, archive_items(30, chunk_size=1))
+        self.assertEqual(["old done"], [item.name for item in ArchivedItem.query])
+        self.assertEqual(["new done", "old pending", "testitem"],
+                         sorted(item.name for item in BucketlistItem.query))
+        # archived items still count
+        db.session.expire_all()
+        bucketlist = Bucketlist.query.get(1)
+        self.assertEqual((4, 2), (bucketlist.item_count, bucketlist.done_count))
+
+    def test_include_archived(self):
+        """Tests reads return archived items only when asked to."""
+        archive_items(30)
+        hot = ["new done", "old pending", "testitem"]
+        everything = ["new done", "old done", "old pending", "testitem"]
+        self.assertEqual(hot, self.names(self.get("/bucketlists/1")["Bucketlist"]["items"]))
+        self.assertEqual(everything, self.names(self.get(
+            "/bucketlists/1?include_archived=true")["Bucketlist"]["items"]))
+        self.assertEqual(everything, self.names(self.get(
+            "/bucketlists/?include_archived=true")["Bucketlists"][0]["items"]))
+        self.assertEqual(["new done"], self.names(self.get(
+            "/bucketlists/1/items/?done=true")["Items"]))
+        self.assertEqual(["new done", "old done"], self.names(self.get(
+            "/bucketlists/1/items/?done=true&include_archived=true&sort=-date_modified")["Items"]))
+
+    def test_restore(self):
+        """Tests archived items come back, unless their name was taken since."""
+        archive_items(30)
+        self.client.post("/bucketlists/1/items/", data=json.dumps(dict(name="old done", done="")),
+                         content_type="application/json",
+                         headers={"Authorization": "Token " + self.token})
+        self.assertEqual((0, 1), restore_items(1))
+
+        db.session.query(BucketlistItem).filter_by(name="old done").delete()
+        db.session.commit()
+        response = self.client.post("/bucketlists/1/items/restore",
+                                    headers={"Authorization": "Token " + self.token})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("1 items have been restored", json.loads(response.data)["Message"])
+        self.assertEqual(0, ArchivedItem.query.count())
+        self.assertTrue(BucketlistItem.query.filter_by(name="old done", done=True).one())
+
+
+if __name__ == '__main__':
+    unittest.main()
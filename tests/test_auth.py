@@ -1,6 +1,10 @@
 import unittest
 from flask import json
 from tests.test_base import BaseTestCase
+from bucketlist import db
+from bucketlist.auth import token_cache
+from bucketlist.hashing import HashingService
+from bucketlist.models import User
 
 
 class APIAuthTests(BaseTestCase):
@@ -81,6 +85,60 @@ class APIAuthTests(BaseTestCase):
         response_msg = json.loads(response.data)
         self.assertIn("Invalid", response_msg["Message"])
 
+    def get_bucketlists(self):
+        return self.client.get("/bucketlists/",
+                               content_type="application/json",
+                               headers={"Authorization": "Token " + self.token})
+
+    def test_verified_token_is_cached(self):
+        """Tests a warm request does not look the user up again."""
+        self.assertEqual(self.get_bucketlists().status_code, 200)
+        hits = token_cache.hits
+        with self.count_queries() as statements:
+            self.assertEqual(self.get_bucketlists().status_code, 200)
+        self.assertEqual(token_cache.hits, hits + 1)
+        self.assertFalse([statement for statement in statements
+                          if "FROM user" in statement])
+
+    def test_key_rotation_invalidates_cache(self):
+        """Tests tokens signed with an old key are rejected once it rotates."""
+        self.assertEqual(self.get_bucketlists().status_code, 200)
+        self.app.config["SECRET_KEY"] += "rotated"
+        self.assertEqual(self.get_bucketlists().status_code, 401)
+
+    def test_user_deletion_invalidates_cache(self):
+        """Tests the tokens of a deleted user are rejected."""
+        self.assertEqual(self.get_bucketlists().status_code, 200)
+        db.session.delete(User.query.get(1))
+        db.session.commit()
+        self.assertEqual(token_cache.stats()["size"], 0)
+        self.assertEqual(self.get_bucketlists().status_code, 401)
+
+    def test_outdated_hash_upgraded_on_login(self):
+        """Tests a hash made with an older cost is replaced at login."""
+        user = User.query.get(1)
+        user.password_hash = HashingService("pbkdf2:sha1", 500, 0).hash("testpass")
+        db.session.commit()
+        self.assertTrue(user.needs_rehash())
+
+        response = self.client.post("/auth/login",
+                                    data=json.dumps(dict(username="testuser",
+                                                    password="testpass")),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(User.query.get(1).needs_rehash())
+
+    def test_process_pool_hashing(self):
+        """Tests passwords can be hashed and checked in worker processes."""
+        hasher = HashingService("pbkdf2:sha256", 1000, 1)
+        try:
+            pwhash = hasher.hash("secret")
+            self.assertTrue(pwhash.startswith("pbkdf2:sha256:1000$"))
+            self.assertTrue(hasher.check(pwhash, "secret"))
+            self.assertFalse(hasher.check(pwhash, "wrong"))
+        finally:
+            hasher.close()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,9 @@
 import unittest
+from contextlib import contextmanager
 from flask import json
-from manage import app, db
+from sqlalchemy import event
+from bucketlist import create_app, db
+from bucketlist.auth import token_cache
 from bucketlist.models import Bucketlist, BucketlistItem
 from config import TestingConfig
 
@@ -10,13 +13,18 @@ class BaseTestCase(unittest.TestCase):
     A base test case which creates dummy
     user, bucketlist and bucketlist item db entries.
     """
+    # config overrides, applied before the app is created
+    settings = {}
+
     def setUp(self):
         """
         Add bucketlists and items directly to db to avoid using tokens 
         required for POST request.
         """
-        app.config.from_object(TestingConfig)
-        self.client = app.test_client()
+        self.app = create_app(type("TestConfig", (TestingConfig,), dict(self.settings)))
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
         db.create_all()
 
         self.client.post("/auth/register",
@@ -31,6 +39,12 @@ class BaseTestCase(unittest.TestCase):
         response_msg = json.loads(response.data)
         self.token = response_msg["Token"]
 
+        # owns testbucketlist3; foreign keys are enforced
+        self.client.post("/auth/register",
+                         data=json.dumps(dict(username="otheruser",
+                                              password="otherpass")),
+                         content_type="application/json")
+
         bucket = {"name": "testbucketlist"}
         test_bucket = Bucketlist()
         test_bucket.import_data(bucket)
@@ -60,5 +74,22 @@ class BaseTestCase(unittest.TestCase):
 
     def tearDown(self):
         """Drops the db."""
+        token_cache.clear()
         db.session.remove()
         db.drop_all()
+        db.get_engine(self.app).dispose()
+        self.app_context.pop()
+
+    @contextmanager
+    def count_queries(self):
+        """Records the SQL statements executed inside the block."""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
@@ -1,7 +1,11 @@
 import unittest
+from datetime import datetime
 from flask import json
+from sqlalchemy.exc import IntegrityError
+from bucketlist import db
 from tests.test_base import BaseTestCase
 from bucketlist.models import BucketlistItem
+from bucketlist.pagination import encode_cursor
 
 
 class TestBucketlistItemViews(BaseTestCase):
@@ -88,6 +92,12 @@ class TestBucketlistItemViews(BaseTestCase):
         response_msg = json.loads(response.data)
         self.assertIn("already exists", response_msg["Message"])
 
+    def test_database_rejects_item_duplicates(self):
+        """Tests the unique index rejects a duplicate item name in a bucketlist."""
+        db.session.add(BucketlistItem(name="testitem", bucket=1, created_by=1))
+        self.assertRaises(IntegrityError, db.session.commit)
+        db.session.rollback()
+
     def test_invalid_update_request(self):
         """Tests error raised when requested item doesn't exist."""
         response = self.client.put("/bucketlists/1/items/2",
@@ -108,6 +118,18 @@ class TestBucketlistItemViews(BaseTestCase):
         response_msg = json.loads(response.data)
         self.assertIn("Updated_Name", response_msg["Message"])
 
+    def test_duplicates_prevented_during_updates(self):
+        """Tests an item can't be renamed to the name of another item."""
+        db.session.add(BucketlistItem(name="otheritem", bucket=1, created_by=1))
+        db.session.commit()
+        response = self.client.put("/bucketlists/1/items/1",
+                                   data=json.dumps(dict(name="otheritem")),
+                                   content_type="application/json",
+                                   headers={'Authorization': 'Token ' + self.token})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already exists", json.loads(response.data)["Message"])
+        self.assertEqual("testitem", BucketlistItem.query.get(1).name)
+
     def test_invalid_name_update(self):
         """Tests name is not changed even if empty string is passed."""
         response = self.client.put("/bucketlists/1/items/1",
@@ -163,6 +185,132 @@ class TestBucketlistItemViews(BaseTestCase):
         response_msg = json.loads(response.data)
         self.assertIn("not found", response_msg["Message"])
 
+    def test_bulk_add_items(self):
+        """Tests many items can be added with a constant number of queries."""
+        items = [dict(name="bulkitem" + str(i), done="") for i in range(200)]
+        with self.count_queries() as statements:
+            response = self.client.post("/bucketlists/1/items/bulk",
+                                        data=json.dumps(items),
+                                        content_type="application/json",
+                                        headers={'Authorization': 'Token ' + self.token})
+        self.assertEqual(response.status_code, 201)
+        self.assertLess(len(statements), 10)
+        response_msg = json.loads(response.data)
+        self.assertEqual(200, response_msg["count"])
+        self.assertEqual(201, response_msg["Results"][0]["status"])
+        self.assertEqual(201, BucketlistItem.query.filter_by(bucket=1).count())
+
+    def test_bulk_results_per_item(self):
+        """Tests invalid items and duplicates are reported one by one."""
+        items = [dict(name="first", done="yes"),
+                 dict(name="testitem", done=""),
+                 dict(name="", done=""),
+                 dict(name="first", done=""),
+                 dict(name="missing done")]
+        response = self.client.post("/bucketlists/1/items/bulk",
+                                    data=json.dumps(items),
+                                    content_type="application/json",
+                                    headers={'Authorization': 'Token ' + self.token})
+        self.assertEqual(response.status_code, 201)
+        results = json.loads(response.data)["Results"]
+        self.assertEqual([201, 400, 400, 400, 400],
+                         [result["status"] for result in results])
+        self.assertIn("already exists", results[1]["Message"])
+        self.assertIn("must have a name", results[2]["Message"])
+        self.assertIn("already exists", results[3]["Message"])
+        self.assertIn("missing", results[4]["Message"])
+        self.assertTrue(BucketlistItem.query.filter_by(name="first").first().done)
+
+    def test_bulk_requires_a_list(self):
+        """Tests error raised when the items are not sent as a list."""
+        response = self.client.post("/bucketlists/1/items/bulk",
+                                    data=json.dumps(dict(name="item", done="")),
+                                    content_type="application/json",
+                                    headers={'Authorization': 'Token ' + self.token})
+        self.assertEqual(response.status_code, 400)
+        response_msg = json.loads(response.data)
+        self.assertIn("list of items", response_msg["Message"])
+
+    def test_bulk_bucketlist_validation(self):
+        """Tests error raised if the bucketlist belongs to another user."""
+        response = self.client.post("/bucketlists/3/items/bulk",
+                                    data=json.dumps([dict(name="item", done="")]),
+                                    content_type="application/json",
+                                    headers={'Authorization': 'Token ' + self.token})
+        self.assertEqual(response.status_code, 404)
+
+    def add_items(self, count):
+        """Adds items to bucketlist 1, one day apart and every other one done."""
+        for i in range(count):
+            date = datetime(2016, 1, 1 + i)
+            db.session.add(BucketlistItem(name="item" + str(i), bucket=1, created_by=1,
+                                          done=i % 2 == 0, date_created=date,
+                                          date_modified=date))
+        db.session.commit()
+
+    def get_items(self, url):
+        response = self.client.get(url, headers={'Authorization': 'Token ' + self.token})
+        return response, json.loads(response.data)
+
+    def test_list_items_a_page_at_a_time(self):
+        """Tests the item pages link to each other and cover every item."""
+        self.add_items(5)
+        response, page = self.get_items("/bucketlists/1/items/?limit=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual("None", page["prev"])
+        ids = []
+        while True:
+            ids.extend(item["id"] for item in page["Items"])
+            if page["next"] == "None":
+                break
+            last = page
+            response, page = self.get_items(page["next"])
+        self.assertEqual([1, 2, 3, 4, 5, 6], ids)
+        response, previous = self.get_items(page["prev"])
+        self.assertEqual(last["Items"], previous["Items"])
+
+    def test_filter_and_sort_items(self):
+        """Tests items can be filtered by done and dates and sorted."""
+        self.add_items(6)
+        response, page = self.get_items("/bucketlists/1/items/?done=true&sort=-date_created"
+                                        "&created_after=2016-01-01&limit=1")
+        names = []
+        while True:
+            names.extend(item["name"] for item in page["Items"])
+            if page["next"] == "None":
+                break
+            response, page = self.get_items(page["next"])
+        self.assertEqual(["item4", "item2"], names)
+        response, page = self.get_items("/bucketlists/1/items/?modified_before=2016-01-03"
+                                        "&done=false")
+        self.assertEqual(["item1"], [item["name"] for item in page["Items"]])
+        response, page = self.get_items("/bucketlists/1/items/?sort=-name&limit=3")
+        self.assertEqual(["testitem", "item5", "item4"], [item["name"] for item in page["Items"]])
+
+    def test_invalid_item_listing(self):
+        """Tests invalid arguments and other users' bucketlists are rejected."""
+        for url in ("/bucketlists/1/items/?sort=done", "/bucketlists/1/items/?done=maybe",
+                    "/bucketlists/1/items/?created_after=yesterday",
+                    "/bucketlists/1/items/?limit=all", "/bucketlists/1/items/?cursor=bogus"):
+            response, page = self.get_items(url)
+            self.assertEqual(response.status_code, 400)
+        # cursors whose key doesn't match the type of the sort column
+        for sort, key in (("name", [[1], 2]), ("id", ["1", 2]), ("date_created", [1, 2])):
+            response, page = self.get_items("/bucketlists/1/items/?sort=%s&cursor=%s"
+                                            % (sort, encode_cursor(1, key)))
+            self.assertEqual(response.status_code, 400)
+        response, page = self.get_items("/bucketlists/3/items/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_bucketlist_with_first_page_of_items(self):
+        """Tests the bucketlist can come with only its first items."""
+        self.add_items(3)
+        response, page = self.get_items("/bucketlists/1?limit=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([1, 2], [item["id"] for item in page["Bucketlist"]["items"]])
+        response, rest = self.get_items(page["next_items"])
+        self.assertEqual([3, 4], [item["id"] for item in rest["Items"]])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,9 @@
 import unittest
 from flask import json
+from sqlalchemy.exc import IntegrityError
 from tests.test_base import BaseTestCase
-from bucketlist.models import Bucketlist
+from bucketlist import db
+from bucketlist.models import Bucketlist, BucketlistItem
 
 
 class TestBucketlistViews(BaseTestCase):
@@ -143,6 +145,27 @@ class TestBucketlistViews(BaseTestCase):
         # asserts that the bucketlist has been deleted from the db
         self.assertEqual(Bucketlist.query.get(1), None)
 
+    def test_delete_cascades_in_the_database(self):
+        """Tests deleting a bucketlist never loads its items."""
+        db.session.bulk_insert_mappings(BucketlistItem, [
+            dict(name="item" + str(n), bucket=2, created_by=1, done=False) for n in range(200)])
+        db.session.commit()
+        # verifies the token, so both deletes are alike
+        self.client.get("/bucketlists/", headers={'Authorization': 'Token ' + self.token})
+
+        counts = []
+        for bucket_id in (1, 2):
+            with self.count_queries() as statements:
+                response = self.client.delete("/bucketlists/" + str(bucket_id),
+                                              content_type="application/json",
+                                              headers={'Authorization': 'Token ' + self.token})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([], [statement for statement in statements
+                                  if "FROM bucketlist_item" in statement])
+            counts.append(len(statements))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(0, BucketlistItem.query.filter(BucketlistItem.bucket.in_([1, 2])).count())
+
     def test_invalid_delete(self):
         """Tests error raised for an invalid delete request."""
         response = self.client.delete("/bucketlists/3",
@@ -206,6 +229,153 @@ class TestBucketlistViews(BaseTestCase):
         response_msg = json.loads(response.data)
         self.assertIn("not found", response_msg["Message"])
 
+    def test_list_query_count_is_independent_of_limit(self):
+        """Tests items are batch loaded instead of once per bucketlist."""
+        for i in range(30):
+            bucketlist = Bucketlist(name="bulk" + str(i), created_by=1)
+            db.session.add(bucketlist)
+            db.session.flush()
+            for j in range(3):
+                db.session.add(BucketlistItem(name="item" + str(j),
+                                              bucket=bucketlist.id,
+                                              created_by=1))
+        db.session.commit()
+
+        counts = []
+        for limit in (2, 2, 30):
+            with self.count_queries() as statements:
+                response = self.client.get("/bucketlists/?limit=" + str(limit),
+                                           content_type="application/json",
+                                           headers={'Authorization': 'Token ' + self.token})
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(statements))
+        # the first request also verifies the token, later ones are cached
+        self.assertEqual(counts[1], counts[2])
+
+        response_msg = json.loads(response.data)
+        self.assertEqual(len(response_msg["Bucketlists"][-1]["items"]), 3)
+
+    def test_cursor_pagination(self):
+        """Tests the next and prev cursors walk through every bucketlist."""
+        response = self.client.get("/bucketlists/?limit=1",
+                                   content_type="application/json",
+                                   headers={'Authorization': 'Token ' + self.token})
+        response_msg = json.loads(response.data)
+        self.assertIn("cursor=", response_msg["next"])
+        self.assertEqual("None", response_msg["prev"])
+        self.assertEqual("Testbucketlist", response_msg["Bucketlists"][0]["name"])
+
+        response = self.client.get(response_msg["next"],
+                                   content_type="application/json",
+                                   headers={'Authorization': 'Token ' + self.token})
+        response_msg = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual("Testbucketlist2", response_msg["Bucketlists"][0]["name"])
+        self.assertEqual("None", response_msg["next"])
+
+        response = self.client.get(response_msg["prev"],
+                                   content_type="application/json",
+                                   headers={'Authorization': 'Token ' + self.token})
+        response_msg = json.loads(response.data)
+        self.assertEqual("Testbucketlist", response_msg["Bucketlists"][0]["name"])
+
+    def test_cursor_pagination_skips_count(self):
+        """Tests keyset pages are fetched without a COUNT query."""
+        with self.count_queries() as statements:
+            self.client.get("/bucketlists/?limit=1",
+                            content_type="application/json",
+                            headers={'Authorization': 'Token ' + self.token})
+        for statement in statements:
+            self.assertNotIn("count(*)", statement.lower())
+
+    def test_page_links_to_cursor(self):
+        """Tests the legacy page parameter links to the next page by cursor."""
+        response = self.client.get("/bucketlists/?limit=1&page=1",
+                                   content_type="application/json",
+                                   headers={'Authorization': 'Token ' + self.token})
+        self.assertEqual(response.status_code, 200)
+        response_msg = json.loads(response.data)
+        self.assertIn("cursor=", response_msg["next"])
+
+    def test_invalid_cursor(self):
+        """Tests error raised for a cursor that cannot be decoded."""
+        response = self.client.get("/bucketlists/?cursor=invalid",
+                                   content_type="application/json",
+                                   headers={'Authorization': 'Token ' + self.token})
+        self.assertEqual(response.status_code, 400)
+        response_msg = json.loads(response.data)
+        self.assertIn("cursor is invalid", response_msg["Message"])
+
+    def test_new_bucketlist_is_a_single_insert(self):
+        """Tests no duplicate check query is made before the insert."""
+        with self.count_queries() as statements:
+            response = self.client.post("/bucketlists/",
+                                        data=json.dumps(dict(name="bucketlist")),
+                                        content_type="application/json",
+                                        headers={"Authorization": "Token " + self.token})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([], [statement for statement in statements
+                              if "FROM bucketlist" in statement])
+
+    def test_database_rejects_duplicates(self):
+        """Tests the unique index rejects a duplicate bucketlist name."""
+        db.session.add(Bucketlist(name="testbucketlist", created_by=1))
+        self.assertRaises(IntegrityError, db.session.commit)
+        db.session.rollback()
+
+        # the same name is fine for another user
+        db.session.add(Bucketlist(name="testbucketlist", created_by=2))
+        db.session.commit()
+
+    def test_rename_to_another_bucketlists_name(self):
+        """Tests renaming a bucketlist to the name of another one is refused."""
+        response = self.client.put("/bucketlists/2",
+                                   data=json.dumps(dict(name="testbucketlist")),
+                                   content_type="application/json",
+                                   headers={"Authorization": "Token " + self.token})
+        self.assertEqual(response.status_code, 400)
+        response_msg = json.loads(response.data)
+        self.assertIn("already exists", response_msg["Message"])
+        self.assertEqual("testbucketlist2", Bucketlist.query.get(2).name)
+
+    def test_sparse_fieldsets(self):
+        """Tests only the requested columns are loaded and returned."""
+        headers = {'Authorization': 'Token ' + self.token}
+        self.client.get("/bucketlists/", headers=headers)
+        with self.count_queries() as statements:
+            response = self.client.get("/bucketlists/?fields=id,name&limit=1", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        response_msg = json.loads(response.data)
+        self.assertEqual([{"id": 1, "name": "Testbucketlist"}], response_msg["Bucketlists"])
+        self.assertIn("fields=id%2Cname", response_msg["next"])
+        # the page loads two columns and the items are never read
+        self.assertEqual(2, len(statements))
+        self.assertTrue(statements[-1].startswith(
+            "SELECT bucketlist.id AS bucketlist_id, bucketlist.name AS bucketlist_name \nFROM"))
+
+    def test_embed(self):
+        """Tests items can be embedded, counted or left out."""
+        headers = {'Authorization': 'Token ' + self.token}
+        counted = json.loads(self.client.get("/bucketlists/?embed=count",
+                                             headers=headers).data)["Bucketlists"]
+        self.assertEqual([1, 0], [bucketlist["item_count"] for bucketlist in counted])
+        self.assertNotIn("items", counted[0])
+        bare = json.loads(self.client.get("/bucketlists/?embed=none",
+                                          headers=headers).data)["Bucketlists"]
+        self.assertEqual(["created_by", "date_created", "date_modified", "id", "name"],
+                         sorted(bare[0]))
+        embedded = json.loads(self.client.get("/bucketlists/?fields=name&embed=items",
+                                              headers=headers).data)["Bucketlists"]
+        self.assertEqual("testitem", embedded[0]["items"][0]["name"])
+
+    def test_invalid_fields(self):
+        """Tests unknown fields and embeds are rejected."""
+        headers = {'Authorization': 'Token ' + self.token}
+        for url in ("/bucketlists/?fields=id,password", "/bucketlists/?fields=",
+                    "/bucketlists/?embed=all"):
+            response = self.client.get(url, headers=headers)
+            self.assertEqual(response.status_code, 400)
+
 
 if __name__ == '__main__':
     unittest.main()
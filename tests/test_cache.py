@@ -0,0 +1,101 @@
+import os
+import unittest
+from flask import json
+from tests.test_base import BaseTestCase
+from bucketlist.cache import get_cache
+from config import TestingConfig
+
+
+class TestMemoryResponseCache(BaseTestCase):
+    """
+    Test read responses are cached per user and invalidated by writes.
+    """
+    settings = {"RESPONSE_CACHE": "memory"}
+
+    def setUp(self):
+        super(TestMemoryResponseCache, self).setUp()
+        self.cache = get_cache()
+
+    def tearDown(self):
+        self.cache.clear()
+        super(TestMemoryResponseCache, self).tearDown()
+
+    def get(self, url, **headers):
+        headers["Authorization"] = "Token " + self.token
+        return self.client.get(url, content_type="application/json", headers=headers)
+
+    def test_repeated_read_is_served_from_cache(self):
+        """Tests a repeated read doesn't touch the database."""
+        first = self.get("/bucketlists/")
+        with self.count_queries() as statements:
+            second = self.get("/bucketlists/")
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first.headers["ETag"], second.headers["ETag"])
+        self.assertEqual([], statements)
+        self.assertEqual(1, self.cache.stats()["hits"])
+
+    def test_cached_response_honours_if_none_match(self):
+        """Tests a cache hit still answers conditional requests."""
+        etag = self.get("/bucketlists/1").headers["ETag"]
+        self.assertEqual(self.get("/bucketlists/1", If_None_Match=etag).status_code, 304)
+
+    def test_bucketlist_write_invalidates(self):
+        """Tests a new bucketlist shows up in a list that was cached."""
+        self.get("/bucketlists/")
+        self.client.post("/bucketlists/",
+                         data=json.dumps(dict(name="fresh")),
+                         content_type="application/json",
+                         headers={"Authorization": "Token " + self.token})
+        response_msg = json.loads(self.get("/bucketlists/").data)
+        self.assertEqual(3, response_msg["count"])
+
+    def test_item_write_invalidates(self):
+        """Tests an item update shows up in a bucketlist that was cached."""
+        self.get("/bucketlists/1")
+        self.client.put("/bucketlists/1/items/1",
+                        data=json.dumps(dict(done="yes")),
+                        content_type="application/json",
+                        headers={'Authorization': 'Token ' + self.token})
+        response_msg = json.loads(self.get("/bucketlists/1").data)
+        self.assertTrue(response_msg["Bucketlist"]["items"][0]["done"])
+
+    def test_failed_reads_are_not_cached(self):
+        """Tests error responses are not cached."""
+        self.get("/bucketlists/3")
+        self.assertEqual(0, self.cache.stats()["entries"])
+
+    def test_entries_expire(self):
+        """Tests entries older than the TTL are not served."""
+        self.app.config["RESPONSE_CACHE_TTL"] = 0
+        self.cache = get_cache()
+        self.get("/bucketlists/")
+        self.get("/bucketlists/")
+        self.assertEqual((0, 2), (self.cache.hits, self.cache.misses))
+
+    def test_stats(self):
+        """Tests the size of the cache is reported."""
+        self.get("/bucketlists/")
+        self.get("/bucketlists/?limit=1")
+        stats = self.cache.stats()
+        self.assertEqual(2, stats["entries"])
+        self.assertGreater(stats["bytes"], 0)
+        self.assertEqual(0.0, stats["hit_ratio"])
+
+
+class TestSQLiteResponseCache(TestMemoryResponseCache):
+    """
+    Test the cache shared by worker processes behaves the same.
+    """
+    settings = {"RESPONSE_CACHE": "sqlite"}
+
+    @classmethod
+    def tearDownClass(cls):
+        for suffix in ("", "-wal", "-shm"):
+            path = TestingConfig.RESPONSE_CACHE_PATH + suffix
+            if os.path.exists(path):
+                os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import zlib
+from flask import json
+from tests.test_base import BaseTestCase
+from bucketlist import db
+from bucketlist.cache import get_cache
+from bucketlist.models import BucketlistItem
+
+
+class TestCompression(BaseTestCase):
+    """
+    Test responses are compressed with the encoding the client accepts.
+    """
+    def setUp(self):
+        super(TestCompression, self).setUp()
+        # makes the list response large enough to be compressed
+        db.session.bulk_insert_mappings(BucketlistItem, [
+            dict(name="item" + str(n), bucket=1, created_by=1, done=False) for n in range(20)])
+        db.session.commit()
+
+    def tearDown(self):
+        if get_cache() is not None:
+            get_cache().clear()
+        super(TestCompression, self).tearDown()
+
+    def get(self, url, encoding=None):
+        headers = {"Authorization": "Token " + self.token}
+        if encoding is not None:
+            headers["Accept-Encoding"] = encoding
+        return self.client.get(url, content_type="application/json", headers=headers)
+
+    def test_gzip_and_deflate(self):
+        """Tests gzip and deflate bodies decompress to the plain response."""
+        plain = self.get("/bucketlists/")
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertIn("Accept-Encoding", plain.headers["Vary"])
+        for encoding, wbits in (("gzip", 16 + zlib.MAX_WBITS), ("deflate", zlib.MAX_WBITS)):
+            response = self.get("/bucketlists/", encoding)
+            self.assertEqual(encoding, response.headers["Content-Encoding"])
+            self.assertLess(len(response.data), len(plain.data))
+            self.assertEqual(len(response.data), response.content_length)
+            self.assertEqual(plain.data, zlib.decompress(response.data, wbits))
+
+    def test_negotiation(self):
+        """Tests the client's qualities are followed and refused encodings never used."""
+        response = self.get("/bucketlists/", "deflate;q=1, gzip;q=0.5")
+        self.assertEqual("deflate", response.headers["Content-Encoding"])
+        response = self.get("/bucketlists/", "gzip;q=0, deflate;q=0, br;q=0")
+        self.assertNotIn("Content-Encoding", response.headers)
+        response = self.get("/bucketlists/", "identity")
+        self.assertNotIn("Content-Encoding", response.headers)
+
+    def test_small_responses(self):
+        """Tests responses under the threshold are sent as they are."""
+        response = self.get("/bucketlists/2", "gzip")
+        self.assertLess(len(response.data), self.app.config["COMPRESS_MIN_SIZE"])
+        self.assertNotIn("Content-Encoding", response.headers)
+
+    def test_streamed_responses(self):
+        """Tests the streamed export is compressed as it is streamed."""
+        # streamed bodies are read before the next request
+        plain = self.get("/bucketlists/export").data
+        response = self.get("/bucketlists/export", "gzip")
+        self.assertEqual("gzip", response.headers["Content-Encoding"])
+        self.assertIsNone(response.content_length)
+        self.assertEqual(plain, zlib.decompress(response.data, 16 + zlib.MAX_WBITS))
+
+    def test_cached_compressed_bodies(self):
+        """Tests the compressed body of a cached response is cached too."""
+        self.app.config["RESPONSE_CACHE"] = "memory"
+        first = self.get("/bucketlists/", "gzip")
+        entries = get_cache().stats()["entries"]
+        second = self.get("/bucketlists/", "gzip")
+        self.assertEqual(2, entries)
+        self.assertEqual(entries, get_cache().stats()["entries"])
+        self.assertEqual(1, get_cache().hits)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(json.loads(self.get("/bucketlists/").data),
+                         json.loads(zlib.decompress(second.data, 16 + zlib.MAX_WBITS)))
+
+
+if __name__ == '__main__':
+    unittest.main()
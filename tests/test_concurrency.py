@@ -0,0 +1,69 @@
+import threading
+import unittest
+from flask import json
+from tests.test_base import BaseTestCase
+from bucketlist import db, create_app
+from bucketlist.models import BucketlistItem
+from config import TestingConfig
+
+
+class TestConcurrency(BaseTestCase):
+    """
+    Test concurrent readers and writers don't lock each other out.
+    """
+    def test_connections_use_wal(self):
+        """Tests the pragmas are applied to new connections."""
+        connection = db.engine.connect()
+        try:
+            self.assertEqual("wal", connection.execute("PRAGMA journal_mode").scalar())
+            self.assertEqual(1, connection.execute("PRAGMA foreign_keys").scalar())
+            self.assertEqual(5000, connection.execute("PRAGMA busy_timeout").scalar())
+        finally:
+            connection.close()
+
+    def test_pool(self):
+        """Tests SQLite files get a QueuePool unless SQLITE_QUEUE_POOL is off."""
+        self.assertEqual("QueuePool", type(db.engine.pool).__name__)
+        other = create_app(type("OtherConfig", (TestingConfig,), {"SQLITE_QUEUE_POOL": False}))
+        with other.app_context():
+            self.assertEqual("NullPool", type(db.get_engine(other).pool).__name__)
+        memory = create_app(type("MemoryConfig", (TestingConfig,),
+                                 {"SQLALCHEMY_DATABASE_URI": "sqlite://"}))
+        with memory.app_context():
+            self.assertEqual("StaticPool", type(db.get_engine(memory).pool).__name__)
+
+    def test_concurrent_reads_and_writes(self):
+        """Tests threads mixing reads and writes all succeed."""
+        threads, requests = 4, 20
+        headers = {"Authorization": "Token " + self.token}
+        errors = []
+
+        def work(worker):
+            client = self.app.test_client()
+            for request in range(requests):
+                try:
+                    if request % 2:
+                        response = client.post("/bucketlists/1/items/", headers=headers,
+                                               content_type="application/json",
+                                               data=json.dumps(dict(
+                                                   name="item %d-%d" % (worker, request),
+                                                   done="")))
+                    else:
+                        response = client.get("/bucketlists/1", headers=headers)
+                    if response.status_code >= 500:
+                        errors.append(response.status_code)
+                except Exception as e:
+                    errors.append(e)
+
+        workers = [threading.Thread(target=work, args=(n,)) for n in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual([], errors)
+        self.assertEqual(1 + threads * requests // 2,
+                         BucketlistItem.query.filter_by(bucket=1).count())
+
+
+if __name__ == '__main__':
+    unittest.main()
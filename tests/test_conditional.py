@@ -0,0 +1,117 @@
+import unittest
+from datetime import datetime, timedelta
+from flask import json
+from werkzeug.http import http_date
+from tests.test_base import BaseTestCase
+
+
+class TestConditionalRequests(BaseTestCase):
+    """
+    Test ETag validation of bucketlists.
+    """
+    def get(self, url, **headers):
+        headers["Authorization"] = "Token " + self.token
+        return self.client.get(url, content_type="application/json", headers=headers)
+
+    def test_validators_are_sent(self):
+        """Tests the list and a single bucketlist carry a weak ETag only."""
+        for url in ("/bucketlists/", "/bucketlists/1"):
+            response = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.headers["ETag"].startswith('W/"'))
+            self.assertNotIn("Last-Modified", response.headers)
+
+    def test_if_none_match(self):
+        """Tests an unchanged list is answered with a 304 from one query."""
+        etag = self.get("/bucketlists/").headers["ETag"]
+        with self.count_queries() as statements:
+            response = self.get("/bucketlists/", If_None_Match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(b"", response.data)
+        self.assertEqual(1, len(statements))
+
+    def test_if_none_match_with_query_args(self):
+        """Tests a page of the list is validated like the whole list."""
+        etag = self.get("/bucketlists/?limit=1").headers["ETag"]
+        self.assertEqual(self.get("/bucketlists/?limit=1", If_None_Match=etag).status_code, 304)
+
+    def test_counts_are_validated_without_the_items(self):
+        """Tests a list without the items is validated from the bucketlists only."""
+        url = "/bucketlists/?fields=id,name&embed=count"
+        etag = self.get(url).headers["ETag"]
+        with self.count_queries() as statements:
+            self.assertEqual(self.get(url, If_None_Match=etag).status_code, 304)
+        self.assertFalse([s for s in statements if "bucketlist_item" in s])
+        self.client.post("/bucketlists/1/items/", data=json.dumps(dict(name="new", done="")),
+                         content_type="application/json",
+                         headers={"Authorization": "Token " + self.token})
+        self.assertEqual(self.get(url, If_None_Match=etag).status_code, 200)
+
+    def test_etag_changes_after_item_write(self):
+        """Tests changing or deleting an item invalidates the ETag."""
+        etag = self.get("/bucketlists/1").headers["ETag"]
+        self.client.put("/bucketlists/1/items/1",
+                        data=json.dumps(dict(done="yes")),
+                        content_type="application/json",
+                        headers={'Authorization': 'Token ' + self.token})
+        response = self.get("/bucketlists/1", If_None_Match=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response.headers["ETag"]
+        self.client.delete("/bucketlists/1/items/1",
+                           headers={'Authorization': 'Token ' + self.token})
+        self.assertEqual(self.get("/bucketlists/", If_None_Match=etag).status_code, 200)
+
+    def test_if_modified_since_does_not_hide_deletes(self):
+        """Tests a list isn't answered with a 304 from its dates alone."""
+        self.client.delete("/bucketlists/2", headers={'Authorization': 'Token ' + self.token})
+        later = http_date(datetime.now() + timedelta(days=1))
+        response = self.get("/bucketlists/", If_Modified_Since=later)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(1, json.loads(response.data)["count"])
+
+    def test_if_match_on_update(self):
+        """Tests an update with a stale ETag is refused."""
+        etag = self.get("/bucketlists/2").headers["ETag"]
+        response = self.client.put("/bucketlists/2",
+                                   data=json.dumps(dict(name="first")),
+                                   content_type="application/json",
+                                   headers={'Authorization': 'Token ' + self.token,
+                                            'If-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.put("/bucketlists/2",
+                                   data=json.dumps(dict(name="second")),
+                                   content_type="application/json",
+                                   headers={'Authorization': 'Token ' + self.token,
+                                            'If-Match': etag})
+        self.assertEqual(response.status_code, 412)
+        response_msg = json.loads(response.data)
+        self.assertIn("has been changed", response_msg["Message"])
+
+    def test_if_match_from_a_get_with_query_args(self):
+        """Tests the ETag of a GET with query args is accepted by If-Match."""
+        etag = self.get("/bucketlists/1?include_archived=true&limit=5").headers["ETag"]
+        response = self.client.put("/bucketlists/1",
+                                   data=json.dumps(dict(name="renamed")),
+                                   content_type="application/json",
+                                   headers={'Authorization': 'Token ' + self.token,
+                                            'If-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_match_on_delete(self):
+        """Tests a delete with a stale ETag is refused."""
+        response = self.client.delete("/bucketlists/1",
+                                      headers={'Authorization': 'Token ' + self.token,
+                                               'If-Match': 'W/"stale"'})
+        self.assertEqual(response.status_code, 412)
+
+        etag = self.get("/bucketlists/1").headers["ETag"]
+        response = self.client.delete("/bucketlists/1",
+                                      headers={'Authorization': 'Token ' + self.token,
+                                               'If-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
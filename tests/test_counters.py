@@ -0,0 +1,67 @@
+import unittest
+from flask import json
+from tests.test_base import BaseTestCase
+from bucketlist import db
+from bucketlist.counters import recompute_counts
+from bucketlist.models import Bucketlist
+
+
+class TestItemCounters(BaseTestCase):
+    """
+    Test the item counters follow every write path and back the stats.
+    """
+    def request(self, method, url, data=None):
+        return getattr(self.client, method)(url, data=json.dumps(data) if data else None,
+                                            content_type="application/json",
+                                            headers={"Authorization": "Token " + self.token})
+
+    def counts(self, bucket_id):
+        db.session.expire_all()
+        bucketlist = Bucketlist.query.get(bucket_id)
+        return bucketlist.item_count, bucketlist.done_count
+
+    def test_counters_follow_item_writes(self):
+        """Tests creating, bulk creating, updating and deleting items."""
+        self.assertEqual((1, 0), self.counts(1))
+        self.request("post", "/bucketlists/1/items/", dict(name="one", done="yes"))
+        self.assertEqual((2, 1), self.counts(1))
+        self.request("post", "/bucketlists/1/items/bulk",
+                     [dict(name="two", done="yes"), dict(name="three", done="")])
+        self.assertEqual((4, 2), self.counts(1))
+        self.request("put", "/bucketlists/1/items/1", dict(done="yes"))
+        self.assertEqual((4, 3), self.counts(1))
+        self.request("delete", "/bucketlists/1/items/1")
+        self.assertEqual((3, 2), self.counts(1))
+
+        body = self.request("get", "/bucketlists/export").data
+        self.request("delete", "/bucketlists/1")
+        self.client.post("/bucketlists/import", data=body, content_type="application/x-ndjson",
+                         headers={"Authorization": "Token " + self.token})
+        imported = Bucketlist.query.filter_by(created_by=1, name="testbucketlist").one()
+        self.assertEqual((3, 2), self.counts(imported.id))
+
+    def test_stats(self):
+        """Tests the stats come from the bucketlists without reading the items."""
+        self.request("post", "/bucketlists/2/items/", dict(name="one", done="yes"))
+        self.request("get", "/bucketlists/")
+        with self.count_queries() as statements:
+            response = self.request("get", "/bucketlists/stats")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([s for s in statements if "FROM bucketlist_item" in s])
+        response_msg = json.loads(response.data)
+        self.assertEqual([(1, 1, 0), (2, 1, 1)],
+                         [(b["id"], b["item_count"], b["done_count"])
+                          for b in response_msg["Bucketlists"]])
+        self.assertEqual({"bucketlists": 2, "items": 2, "done": 1}, response_msg["total"])
+
+    def test_recompute_counts(self):
+        """Tests counters that drifted are recomputed from the items."""
+        db.session.execute("UPDATE bucketlist SET item_count = 7, done_count = 5")
+        db.session.commit()
+        recompute_counts()
+        self.assertEqual((1, 0), self.counts(1))
+        self.assertEqual((0, 0), self.counts(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
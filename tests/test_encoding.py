@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import unittest
+from datetime import datetime
+from flask import json
+from werkzeug.http import http_date
+from tests.test_base import BaseTestCase
+from bucketlist.encoding import BACKENDS, format_date
+
+
+class TestEncoding(BaseTestCase):
+    """
+    Test compact responses are encoded the same way by every backend.
+    """
+    def get(self, url):
+        return self.client.get(url, content_type="application/json",
+                               headers={"Authorization": "Token " + self.token})
+
+    def test_format_date(self):
+        """Tests dates are formatted like Flask's encoder did."""
+        for value in (datetime(2016, 2, 29, 0, 0, 0), datetime(1999, 12, 31, 23, 59, 59, 999),
+                      datetime(2024, 7, 7, 7, 7, 7)):
+            self.assertEqual(http_date(value.utctimetuple()), format_date(value))
+        self.assertIsNone(format_date(None))
+
+    def test_compact_responses(self):
+        """Tests compact responses have no whitespace between tokens."""
+        self.app.config["JSONIFY_PRETTYPRINT_REGULAR"] = False
+        pretty = json.loads(self.get("/bucketlists/1").data)
+        response = self.get("/bucketlists/1")
+        self.assertEqual("application/json", response.mimetype)
+        self.assertNotIn(b'": ', response.data)
+        self.assertEqual(pretty, json.loads(response.data))
+
+    @unittest.skipIf(len(BACKENDS) < 2, "only the stdlib JSON backend is installed")
+    def test_backends_produce_the_same_bytes(self):
+        """Tests every backend encodes a response identically."""
+        self.client.put("/bucketlists/1", data=json.dumps(dict(name=u"café </a> \"ü\"")),
+                        content_type="application/json",
+                        headers={"Authorization": "Token " + self.token})
+        self.app.config["JSONIFY_PRETTYPRINT_REGULAR"] = False
+        bodies = set()
+        for backend in BACKENDS:
+            self.app.config["JSON_BACKEND"] = backend
+            bodies.add(self.get("/bucketlists/").data)
+            bodies.add(self.get("/bucketlists/export").data)
+        self.assertEqual(2, len(bodies))
+
+
+if __name__ == '__main__':
+    unittest.main()
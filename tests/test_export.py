@@ -0,0 +1,116 @@
+import unittest
+from flask import json
+from tests.test_base import BaseTestCase
+from bucketlist import db
+from bucketlist.models import Bucketlist, BucketlistItem
+
+
+class TestExportImport(BaseTestCase):
+    """
+    Test streaming export and import of bucketlists.
+    """
+    def export(self):
+        response = self.client.get("/bucketlists/export",
+                                   headers={'Authorization': 'Token ' + self.token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual("application/x-ndjson", response.mimetype)
+        return response.data
+
+    def import_(self, body):
+        response = self.client.post("/bucketlists/import", data=body,
+                                    content_type="application/x-ndjson",
+                                    headers={'Authorization': 'Token ' + self.token})
+        return response.status_code, json.loads(response.data)
+
+    def test_export_streams_one_line_per_bucketlist(self):
+        """Tests every bucketlist of the user is exported with its items."""
+        lines = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual(["testbucketlist", "testbucketlist2"],
+                         [line["name"] for line in lines])
+        self.assertEqual("testitem", lines[0]["items"][0]["name"])
+
+    def test_export_in_chunks(self):
+        """Tests bucketlists beyond the chunk size are all exported."""
+        self.app.config["STREAM_CHUNK_SIZE"] = 2
+        for i in range(5):
+            db.session.add(Bucketlist(name="chunk" + str(i), created_by=1))
+        db.session.commit()
+        self.assertEqual(7, len(self.export().splitlines()))
+
+    def test_export_import_round_trip(self):
+        """Tests an export can be imported back after the data was deleted."""
+        body = self.export()
+        for bucketlist in Bucketlist.query.filter_by(created_by=1):
+            db.session.delete(bucketlist)
+        db.session.commit()
+
+        status, response_msg = self.import_(body)
+        self.assertEqual(status, 201)
+        self.assertEqual(2, response_msg["count"])
+        self.assertEqual(2, Bucketlist.query.filter_by(created_by=1).count())
+        item = BucketlistItem.query.filter_by(name="testitem").first()
+        self.assertEqual(1, item.created_by)
+        self.assertFalse(item.done)
+        # names and creation dates come back as they were
+        def fields(export):
+            return [(line["name"], line["date_created"],
+                     [(item["name"], item["date_created"]) for item in line["items"]])
+                    for line in map(json.loads, export.decode("utf-8").splitlines())]
+        self.assertEqual(fields(body), fields(self.export()))
+
+    def test_import_keeps_names_and_creation_dates(self):
+        """Tests names aren't title-cased and creation dates are kept."""
+        body = json.dumps({"name": "paris trip", "date_created": "Sun, 06 Nov 2016 08:49:37 GMT",
+                           "items": [{"name": "louvre", "done": False,
+                                      "date_created": "Mon, 07 Nov 2016 10:00:00 GMT"}]})
+        self.assertEqual(201, self.import_(body)[0])
+        bucketlist = Bucketlist.query.filter_by(name="paris trip").one()
+        self.assertEqual("2016-11-06 08:49:37", str(bucketlist.date_created))
+        self.assertEqual("2016-11-07 10:00:00",
+                         str(BucketlistItem.query.filter_by(name="louvre").one().date_created))
+        self.assertIn(b'"name":"paris trip"', self.export())
+
+    def test_import_reports_dropped_items(self):
+        """Tests invalid and duplicate items of a line are reported."""
+        body = json.dumps({"name": "imported", "items": [
+            {"name": "a", "done": True}, {"name": "", "done": True},
+            {"name": "a", "done": False}, ["not", "an", "item"]]})
+        status, response_msg = self.import_(body)
+        self.assertEqual(status, 201)
+        self.assertEqual([(1, 1), (1, 2), (1, 3)], [(error["line"], error["item"])
+                                                    for error in response_msg["Errors"]])
+        self.assertEqual(1, BucketlistItem.query.filter_by(name="a").count())
+
+    def test_import_retries_a_conflicting_chunk_line_by_line(self):
+        """Tests a name taken since the duplicate check only rejects its own line."""
+        existing_names = Bucketlist.existing_names
+        # as if another request created testbucketlist after the check
+        Bucketlist.existing_names = staticmethod(lambda user_id, names: set())
+        try:
+            status, response_msg = self.import_("\n".join([
+                json.dumps({"name": "first"}), json.dumps({"name": "testbucketlist"}),
+                json.dumps({"name": "third", "items": [{"name": "x", "done": False}]})]))
+        finally:
+            Bucketlist.existing_names = existing_names
+        self.assertEqual(status, 201)
+        self.assertEqual(2, response_msg["count"])
+        self.assertEqual([2], [error["line"] for error in response_msg["Errors"]])
+        self.assertEqual(1, Bucketlist.query.filter_by(name="third").one().item_count)
+
+    def test_import_reports_bad_lines(self):
+        """Tests invalid lines and duplicates are reported by line number."""
+        body = "\n".join([json.dumps({"name": "imported",
+                                      "items": [{"name": "a", "done": True}]}),
+                          "not json",
+                          json.dumps({"name": ""}),
+                          json.dumps({"name": "testbucketlist"}),
+                          json.dumps({"name": "imported"})])
+        status, response_msg = self.import_(body)
+        self.assertEqual(status, 201)
+        self.assertEqual(1, response_msg["count"])
+        self.assertEqual([2, 3, 4, 5], [error["line"] for error in response_msg["Errors"]])
+        self.assertTrue(BucketlistItem.query.filter_by(name="a").first().done)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from tests.test_base import BaseTestCase
+from bucketlist.metrics import Metrics, get_metrics
+
+
+class TestMetrics(BaseTestCase):
+    """
+    Test request latency, query counts and sizes are exposed at /metrics.
+    """
+    def setUp(self):
+        super(TestMetrics, self).setUp()
+        get_metrics().clear()
+
+    def get(self, url):
+        return self.client.get(url, content_type="application/json",
+                               headers={"Authorization": "Token " + self.token})
+
+    def test_query_count_header(self):
+        """Tests the number of statements a request ran is returned."""
+        with self.count_queries() as statements:
+            response = self.get("/bucketlists/1")
+        self.assertEqual(str(len(statements)), response.headers["X-Query-Count"])
+
+    def test_metrics_per_endpoint(self):
+        """Tests requests are counted by endpoint in the Prometheus format."""
+        self.get("/bucketlists/")
+        self.get("/bucketlists/")
+        self.get("/bucketlists/404")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/plain", response.headers["Content-Type"])
+        body = response.data.decode("utf-8")
+        self.assertIn('bucketlist_request_duration_seconds_count{endpoint="api.all_bucketlists"} 2',
+                      body)
+        self.assertIn('bucketlist_request_duration_seconds_bucket{endpoint="api.all_bucketlists",'
+                      'le="+Inf"} 2', body)
+        self.assertIn('bucketlist_requests_total{endpoint="api.get_bucketlist",status="404"} 1',
+                      body)
+        self.assertIn('bucketlist_db_queries_total{endpoint="api.all_bucketlists"}', body)
+        self.assertIn('bucketlist_response_bytes_total{endpoint="api.all_bucketlists"}', body)
+        self.assertIn("bucketlist_token_cache_hits_total", body)
+
+    def test_metrics_can_be_turned_off(self):
+        """Tests nothing is recorded or exposed when metrics are off."""
+        self.app.config["METRICS"] = False
+        response = self.get("/bucketlists/")
+        self.assertNotIn("X-Query-Count", response.headers)
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        self.assertEqual({}, get_metrics().counters)
+
+    def test_processes_share_the_file(self):
+        """Tests the counters of processes add up and outlive them."""
+        handle, path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(handle)
+        try:
+            workers = [Metrics(path), Metrics(path)]
+            workers[0].observe("api.all_bucketlists", 200, 0.02, 3, 0.01, 100)
+            workers[1].observe("api.all_bucketlists", 200, 7.0, 2, 0.01, 50)
+            workers[1].count_caches([("token_cache", {"hits": 4, "misses": 1})])
+            workers[0].flush()
+            body = workers[1].render()
+            self.assertIn('bucketlist_request_duration_seconds_count{endpoint="api.all_bucketlists"} 2',
+                          body)
+            self.assertIn('bucketlist_request_duration_seconds_bucket{endpoint="api.all_bucketlists",'
+                          'le="0.025"} 1', body)
+            self.assertIn('bucketlist_db_queries_total{endpoint="api.all_bucketlists"} 5', body)
+            self.assertIn("bucketlist_token_cache_hits_total 4", body)
+            # a replaced worker starts from the totals
+            self.assertEqual(body, Metrics(path).render())
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
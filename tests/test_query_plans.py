@@ -0,0 +1,93 @@
+import re
+import unittest
+from flask import json
+from sqlalchemy import event
+from tests.test_base import BaseTestCase
+from bucketlist import db
+
+
+class TestQueryPlans(BaseTestCase):
+    """
+    Test every query the views issue is answered from an index.
+
+    Each endpoint is called once and EXPLAIN QUERY PLAN is run on the
+    statements it issued. A full scan of a table (or of all of one of its
+    indexes) fails the test, so O(n) lookups can't quietly come back.
+    New endpoints should be added to 'tour'.
+    """
+    def tour(self):
+        """Calls every endpoint the way a client would"""
+        headers = {"Authorization": "Token " + self.token}
+
+        def call(method, url, data=None):
+            if isinstance(data, (dict, list)):
+                data = json.dumps(data)
+            return getattr(self.client, method)(url, data=data, headers=headers,
+                                                content_type="application/json")
+
+        call("post", "/auth/register", dict(username="planner", password="plan"))
+        call("post", "/auth/login", dict(username="testuser", password="testpass"))
+        call("get", "/bucketlists/")
+        next_page = json.loads(call("get", "/bucketlists/?limit=1").data)["next"]
+        prev_page = json.loads(call("get", next_page).data)["prev"]
+        call("get", prev_page)
+        call("get", "/bucketlists/?limit=1&page=2")
+        call("get", "/bucketlists/?q=testbucket")
+        call("get", "/bucketlists/?fields=id,name&embed=count")
+        call("get", "/bucketlists/stats")
+        call("get", "/bucketlists/1")
+        call("get", "/bucketlists/1?limit=1")
+        call("post", "/bucketlists/", dict(name="planned"))
+        call("put", "/bucketlists/2", dict(name="renamed"))
+        call("post", "/bucketlists/1/items/", dict(name="planned", done=""))
+        call("post", "/bucketlists/1/items/bulk", [dict(name="bulk", done="")])
+        for sort in ("id", "-name", "date_created", "-date_modified"):
+            page = json.loads(call("get", "/bucketlists/1/items/?limit=1&sort=" + sort).data)
+            call("get", page["next"])
+        call("get", "/bucketlists/1/items/?done=true&modified_after=2016-01-01")
+        call("get", "/bucketlists/1/items/?include_archived=true&sort=-date_created")
+        call("get", "/bucketlists/1?include_archived=true&limit=1")
+        call("get", "/bucketlists/?include_archived=true")
+        call("put", "/bucketlists/1/items/1", dict(done="yes"))
+        body = call("get", "/bucketlists/export").data
+        call("delete", "/bucketlists/1/items/1")
+        call("delete", "/bucketlists/1")
+        call("post", "/bucketlists/import", body)
+        token = json.loads(call("get", "/bucketlists/changes?limit=1").data)["sync_token"]
+        call("get", "/bucketlists/changes?since=" + token)
+
+    def test_no_full_table_scans(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.split()[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+                statements.append((statement, parameters[0] if executemany else parameters))
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            self.tour()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        self.assertTrue(statements)
+
+        tables = set(db.metadata.tables)
+        checked = 0
+        connection = db.engine.raw_connection()
+        try:
+            for statement, parameters in statements:
+                plan = connection.cursor().execute("EXPLAIN QUERY PLAN " + statement,
+                                                   parameters).fetchall()
+                for row in plan:
+                    checked += 1
+                    # SQLite before 3.24 writes "SCAN TABLE x"; materialized
+                    # subqueries and the search index are fine to scan
+                    scan = re.match(r"SCAN (TABLE )?(\w+)", row[-1])
+                    if scan and scan.group(2) in tables:
+                        self.fail("Full scan of %s in:\n%s" % (scan.group(2), statement))
+        finally:
+            connection.close()
+        self.assertTrue(checked)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from flask import json
+from tests.test_base import BaseTestCase
+from bucketlist import db
+from bucketlist.models import Bucketlist, BucketlistItem
+from bucketlist.search import search_bucketlists, rebuild_index, match_expression
+
+
+class TestSearch(BaseTestCase):
+    """
+    Test full-text search of bucketlists and items.
+    """
+    def search(self, q):
+        response = self.client.get("/bucketlists/?q=" + q,
+                                   content_type="application/json",
+                                   headers={'Authorization': 'Token ' + self.token})
+        return response.status_code, json.loads(response.data)
+
+    def test_match_expression(self):
+        """Tests every word is turned into a prefix match."""
+        self.assertEqual('"trip"* "par"*', match_expression("trip, par"))
+        self.assertEqual("", match_expression("%*"))
+        self.assertEqual('created_by : "7" AND name : ("trip"*)', match_expression("trip", 7))
+
+    def test_prefix_search(self):
+        """Tests a bucketlist can be found by the start of a word."""
+        status, response_msg = self.search("testbuck")
+        self.assertEqual(status, 200)
+        self.assertEqual(2, response_msg["count"])
+
+    def test_search_by_item_name(self):
+        """Tests a bucketlist can be found by the name of one of its items."""
+        status, response_msg = self.search("testitem")
+        self.assertEqual(status, 200)
+        self.assertEqual(1, response_msg["count"])
+        self.assertEqual("Testbucketlist", response_msg["Bucketlists"][0]["name"])
+
+    def test_search_is_limited_to_the_user(self):
+        """Tests another user's bucketlists are not found."""
+        self.assertEqual([1, 2], sorted(search_bucketlists(1, "testbucketlist")))
+        self.assertEqual([3], search_bucketlists(2, "testbucketlist3"))
+        self.assertEqual([], search_bucketlists(2, "testitem"))
+
+    def test_best_match_first(self):
+        """Tests results are ranked by how well they match."""
+        db.session.add(Bucketlist(name="paris trip", created_by=1))
+        db.session.add(Bucketlist(name="paris paris paris", created_by=1))
+        db.session.commit()
+        self.assertEqual([5, 4], search_bucketlists(1, "paris"))
+        self.assertEqual([4], search_bucketlists(1, "paris", offset=1, limit=1))
+
+    def test_index_follows_updates_and_deletes(self):
+        """Tests the index is kept in sync with writes."""
+        item = BucketlistItem.query.get(1)
+        item.name = "skydiving"
+        db.session.commit()
+        self.assertEqual([], search_bucketlists(1, "testitem"))
+        self.assertEqual([1], search_bucketlists(1, "sky"))
+
+        db.session.delete(item)
+        db.session.commit()
+        self.assertEqual([], search_bucketlists(1, "sky"))
+
+    def test_search_pagination(self):
+        """Tests search results can be paged through with cursors."""
+        response = self.client.get("/bucketlists/?q=testbucketlist&limit=1",
+                                   content_type="application/json",
+                                   headers={'Authorization': 'Token ' + self.token})
+        response_msg = json.loads(response.data)
+        first = response_msg["Bucketlists"][0]["id"]
+        response = self.client.get(response_msg["next"],
+                                   content_type="application/json",
+                                   headers={'Authorization': 'Token ' + self.token})
+        response_msg = json.loads(response.data)
+        self.assertEqual(1, response_msg["count"])
+        self.assertNotEqual(first, response_msg["Bucketlists"][0]["id"])
+        self.assertEqual("None", response_msg["next"])
+
+    def test_rebuild_index(self):
+        """Tests the index can be rebuilt from the tables."""
+        db.session.execute("INSERT INTO bucketlist_fts(bucketlist_fts) VALUES ('delete-all')")
+        db.session.commit()
+        rebuild_index()
+        self.assertEqual([1, 2], sorted(search_bucketlists(1, "testbucketlist")))
+
+
+if __name__ == '__main__':
+    unittest.main()
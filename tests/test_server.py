@@ -0,0 +1,22 @@
+import unittest
+from tests.test_base import BaseTestCase
+from bucketlist.server import Server, dispose_engine
+
+
+class TestServer(BaseTestCase):
+    """
+    Test the pre-fork server is configured from the serve options.
+    """
+    def test_server_options(self):
+        """Tests the app is preloaded and workers drop inherited connections."""
+        server = Server(self.app, {"workers": 3, "threads": 2, "max_requests": 100})
+        self.assertEqual(3, server.cfg.workers)
+        self.assertEqual(2, server.cfg.threads)
+        self.assertEqual(100, server.cfg.max_requests)
+        self.assertTrue(server.cfg.preload_app)
+        self.assertIs(dispose_engine, server.cfg.post_fork)
+        self.assertIs(self.app, server.load())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from tests.test_base import BaseTestCase
+from bucketlist.slow_queries import fingerprint, parameter_shape, get_query_log
+
+
+class TestSlowQueries(BaseTestCase):
+    """
+    Test statements are aggregated by fingerprint and slow ones are logged.
+    """
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(handle)
+        self.settings = {"SLOW_QUERY_LOG_PATH": self.path, "SLOW_QUERY_THRESHOLD": 0}
+        super(TestSlowQueries, self).setUp()
+        self.query_log = get_query_log()
+
+    def tearDown(self):
+        super(TestSlowQueries, self).tearDown()
+        os.remove(self.path)
+
+    def test_fingerprint(self):
+        """Tests literals and parameter lists are collapsed."""
+        self.assertEqual("SELECT * FROM item WHERE id IN (...) AND name = ? LIMIT ?",
+                         fingerprint("SELECT *  FROM item\n WHERE id IN (?, ?, ?) "
+                                     "AND name = 'it''s' LIMIT 20"))
+        self.assertEqual(fingerprint("SELECT a FROM t1 WHERE id IN (?, ?)"),
+                         fingerprint("SELECT a FROM t1 WHERE id IN (?, ?, ?, ?)"))
+
+    def test_parameter_shape(self):
+        """Tests bound parameters are described by their types only."""
+        self.assertEqual("(int x 3, str)", parameter_shape((1, 2, 3, "secret")))
+        self.assertEqual("2 x (int, bool)", parameter_shape([(1, True), (2, False)], True))
+
+    def test_slow_statements_are_recorded_with_view_and_user(self):
+        """Tests the top table and the slow log of the statements of a view."""
+        self.client.get("/bucketlists/1", content_type="application/json",
+                        headers={"Authorization": "Token " + self.token})
+        statements = [row[0] for row in self.query_log.top(50)]
+        self.assertTrue([s for s in statements if "FROM bucketlist " in s])
+        recent = self.query_log.recent(50)
+        self.assertIn(("api.get_bucketlist", 1), [(row[3], row[4]) for row in recent])
+        for statement, parameters, seconds, view, user_id in recent:
+            self.assertNotIn("testbucketlist", parameters)
+
+    def test_requests_dont_write_the_file(self):
+        """Tests statements are buffered until the log is flushed."""
+        self.query_log.flush()
+        self.query_log.interval = 3600
+        self.client.get("/bucketlists/1", content_type="application/json",
+                        headers={"Authorization": "Token " + self.token})
+        connection = sqlite3.connect(self.path)
+        try:
+            count = "SELECT count(*) FROM slow_query WHERE view = 'api.get_bucketlist'"
+            self.assertEqual(0, connection.execute(count).fetchone()[0])
+            self.query_log.flush()
+            self.assertTrue(connection.execute(count).fetchone()[0])
+        finally:
+            connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
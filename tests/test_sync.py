@@ -0,0 +1,100 @@
+import unittest
+from flask import json
+from tests.test_base import BaseTestCase
+from bucketlist import db
+from bucketlist.models import BucketlistItem
+from bucketlist.sync import encode_token
+
+
+class TestSyncFeed(BaseTestCase):
+    """
+    Test the changes feed returns only what changed since a sync token.
+    """
+    def request(self, method, url, data=None):
+        return getattr(self.client, method)(url, data=json.dumps(data) if data else None,
+                                            content_type="application/json",
+                                            headers={"Authorization": "Token " + self.token})
+
+    def sync(self, token=None, limit=None):
+        url = "/bucketlists/changes"
+        args = [arg for arg in ("since=" + token if token else None,
+                                "limit=%d" % limit if limit else None) if arg]
+        if args:
+            url += "?" + "&".join(args)
+        response = self.request("get", url)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+
+    def add_deleted_items(self, count):
+        db.session.bulk_insert_mappings(BucketlistItem, [
+            dict(name="gone" + str(n), bucket=2, created_by=1, done=False) for n in range(count)])
+        db.session.commit()
+        return [item.id for item in BucketlistItem.query.filter(BucketlistItem.name.like("gone%"))]
+
+    def test_initial_sync(self):
+        """Tests syncing without a token returns all the user's data."""
+        response_msg = self.sync()
+        self.assertEqual([1, 2], [b["id"] for b in response_msg["Bucketlists"]])
+        self.assertEqual([(1, 1)], [(i["id"], i["bucket"]) for i in response_msg["Items"]])
+        self.assertEqual({"bucketlists": [], "items": []}, response_msg["Deleted"])
+        self.assertFalse(response_msg["more"])
+
+    def test_changes_since_token(self):
+        """Tests only changes and deletions after the token are returned."""
+        token = self.sync()["sync_token"]
+        response_msg = self.sync(token)
+        self.assertEqual(([], []), (response_msg["Bucketlists"], response_msg["Items"]))
+
+        self.request("put", "/bucketlists/2", dict(name="renamed"))
+        self.request("post", "/bucketlists/2/items/", dict(name="new", done=""))
+        self.request("delete", "/bucketlists/1/items/1")
+        response_msg = self.sync(token)
+        self.assertEqual(["Renamed"], [b["name"] for b in response_msg["Bucketlists"]])
+        self.assertEqual(["new"], [i["name"] for i in response_msg["Items"]])
+        self.assertEqual({"bucketlists": [], "items": [1]}, response_msg["Deleted"])
+
+        token = response_msg["sync_token"]
+        self.request("delete", "/bucketlists/1")
+        response_msg = self.sync(token)
+        self.assertEqual(([], []), (response_msg["Bucketlists"], response_msg["Items"]))
+        self.assertEqual({"bucketlists": [1], "items": []}, response_msg["Deleted"])
+
+    def test_sync_in_pages(self):
+        """Tests large changes are returned a limited number at a time."""
+        db.session.bulk_insert_mappings(BucketlistItem, [
+            dict(name="item" + str(n), bucket=2, created_by=1, done=False) for n in range(5)])
+        db.session.commit()
+        ids, token, more = [], None, True
+        while more:
+            response_msg = self.sync(token, limit=2)
+            ids.extend(item["id"] for item in response_msg["Items"])
+            token, more = response_msg["sync_token"], response_msg["more"]
+        self.assertEqual([1, 2, 3, 4, 5, 6], sorted(ids))
+
+    def test_deletions_in_pages(self):
+        """Tests deletions are limited too, and changes wait until they're all read."""
+        token = self.sync()["sync_token"]
+        for item_id in self.add_deleted_items(5):
+            self.request("delete", "/bucketlists/2/items/%d" % item_id)
+        self.request("put", "/bucketlists/2", dict(name="renamed"))
+        deleted, pages, more = [], [], True
+        while more:
+            response_msg = self.sync(token, limit=2)
+            deleted.extend(response_msg["Deleted"]["items"])
+            pages.append([b["name"] for b in response_msg["Bucketlists"]])
+            token, more = response_msg["sync_token"], response_msg["more"]
+        self.assertEqual(5, len(set(deleted)))
+        self.assertEqual([[], [], ["Renamed"]], pages)
+
+    def test_invalid_token(self):
+        """Tests tokens that can't be decoded or belong to others are rejected."""
+        response = self.request("get", "/bucketlists/changes?since=invalid")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("sync token is invalid", json.loads(response.data)["Message"])
+        response = self.request("get", "/bucketlists/changes?since=" +
+                                encode_token(2, None, None, None))
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()